@@ -1,52 +1,302 @@
 import sys
+import ctypes
 import json
 import os
-import requests
+import functools
+import html
+import itertools
+import logging
+import queue
+import re
+import secrets
+import threading
+import time
+from collections import deque
+from logging.handlers import MemoryHandler, QueueHandler, QueueListener
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget,
-    QTextEdit, QLineEdit, QPushButton, QScrollArea, QFrame, QLabel,
+    QLineEdit, QPushButton, QLabel,
     QMessageBox, QProgressBar, QDialog, QDialogButtonBox, QComboBox,
     QCheckBox, QSpinBox, QGroupBox, QGridLayout, QSplitter, QTabWidget,
     QFileDialog, QListWidget, QListWidgetItem, QTextBrowser
 )
-from PyQt6.QtCore import QThread, pyqtSignal, Qt, QTimer
-from PyQt6.QtGui import QFont, QPixmap, QIcon
-import xlwings as xw
-from fuzzywuzzy import fuzz
+from PyQt6.QtCore import (
+    QThread, QThreadPool, QRunnable, QObject, QMetaObject, pyqtSignal, pyqtSlot, Qt, QTimer,
+    QStringListModel
+)
+from PyQt6.QtGui import (
+    QFont, QPixmap, QIcon, QColor, QTextCursor, QTextDocument, QTextCharFormat,
+    QTextFrameFormat, QTextLength, QTextTableFormat, QDesktopServices
+)
 from datetime import datetime
+# xlwings and excel_processor (numpy, rapidfuzz) are imported on first use so
+# they stay off the window's startup path
+
+logger = logging.getLogger(__name__)
+
+APP_NAME = "Excel Trial Balance ChatBot"
+APP_VERSION = "1.0"
+
+# System prompt sent with every OpenRouter request
+SYSTEM_PROMPT = """You are an Excel Trial Balance Assistant. You help users analyze and update Excel trial balance data.
+
+Your capabilities include:
+- Analyzing Excel workbook structure
+- Identifying trial balance data patterns
+- Guiding users through update processes
+- Providing Excel-related advice
+
+Be helpful, concise, and focus on Excel trial balance operations. Use emojis and formatting to make responses clear and engaging."""
+
+# Keyword routing for chat messages (done on the GUI thread): single words are matched against the
+# message's tokens, multi-word phrases with one precompiled regex. Inflected forms are listed
+# so whole-token matching still catches e.g. 'updating' and 'structures'.
+HELP_KEYWORDS = frozenset({"help", "commands"})
+HELP_PHRASES = re.compile(r"what can you do")
+ANALYZE_KEYWORDS = frozenset({
+    "analyze", "analyzes", "analyzed", "analyzing",
+    "structure", "structures", "structured",
+})
+UPDATE_KEYWORDS = frozenset({"update", "updates", "updated", "updating"})
+
+# Whole-message commands handled directly by send_message
+CLEAR_COMMANDS = frozenset({"clear", "clear chat"})
+STATUS_COMMANDS = frozenset({"status", "excel status"})
+ANALYZE_COMMANDS = frozenset({"analyze", "analyze excel"})
+UPDATE_COMMANDS = frozenset({"update", "start update"})
+
+# Canned replies; pre-rendered by the GUI at startup so they never hit the markdown parser
+HELP_MESSAGE = """🤖 **Excel Trial Balance Assistant**
+
+I can help you with:
+
+**📊 Analysis:**
+• Analyze Excel workbook structure
+• Identify trial balance data
+• Review column mappings
+
+**🔄 Updates:**
+• Guide you through trial balance updates
+• Perform automated updates with your approval
+• Verify update results
+
+**💬 Chat:**
+• Answer questions about Excel operations
+• Provide guidance on trial balance processes
+• Help troubleshoot issues
+
+**Commands:**
+• Type 'analyze' to analyze current workbook
+• Type 'update' to start update process
+• Ask any questions about your Excel data!"""
+
+UPDATE_GUIDE_MESSAGE = """🔄 **Trial Balance Update Process**
+
+To update your trial balance, I'll need to:
+
+1. **Analyze** your current Excel structure
+2. **Identify** trial balance columns (Account, Debit, Credit)
+3. **Map** your data to standard format
+4. **Preview** proposed changes
+5. **Execute** updates with your approval
+
+Would you like me to start by analyzing your current workbook structure?"""
+
+WELCOME_MESSAGE = (
+    "👋 Welcome to Excel Trial Balance Assistant!\n\n"
+    "I can help you analyze and update Excel trial balance data. "
+    "Type 'help' to see what I can do, or 'analyze' to start analyzing your current workbook."
+)
+
+CHAT_CLEARED_MESSAGE = "👋 Chat cleared! I'm ready to help with your Excel trial balance operations."
+
+# Statuses that end an operation and hide the progress bar (casefolded)
+IDLE_STATUSES = frozenset({"ready", "complete"})
+
+# Errors are shown as escaped plain text, so only this prefix is markup
+ERROR_PREFIX_HTML = '<span style="color: #c00;">❌ <b>Error:</b></span> '
+
+# Seconds within which a repeat of the same error isn't shown again
+ERROR_REPEAT_WINDOW = 2.0
+
+# Older message bubbles are dropped so appends stay cheap in long sessions
+MAX_CHAT_MESSAGES = 500
+
+# Longer messages are rendered as a preview with a "Show more" link
+COLLAPSE_CHARS = 2000
+
+# URL scheme of "Show more" links; the path is a random token, so links in model
+# replies can't name a collapsed message
+EXPAND_SCHEME = "tb-expand"
+
+# Messages that are nothing but a greeting, thanks or goodbye get a canned reply
+# instead of an API round trip
+SMALL_TALK = re.compile(
+    r"\s*(?:(?P<greeting>hi|hello|hey)|(?P<thanks>thanks?|thank you)|(?P<bye>bye|goodbye))\b[\s!.,]*",
+    re.IGNORECASE
+)
+SMALL_TALK_REPLIES = {
+    'greeting': "👋 Hello! Type 'help' to see what I can do, or 'analyze' to look at your workbook.",
+    'thanks': "😊 You're welcome! Let me know if there's anything else to do in your trial balance.",
+    'bye': "👋 Goodbye! Come back any time you need to update a trial balance.",
+}
+
+@functools.lru_cache(maxsize=2)
+def bubble_format(is_assistant):
+    """Table format for a message bubble, built once per sender kind"""
+    fmt = QTextTableFormat()
+    fmt.setWidth(QTextLength(QTextLength.Type.PercentageLength, 100))
+    fmt.setCellPadding(8)
+    fmt.setCellSpacing(0)
+    fmt.setMargin(2)
+    fmt.setBorder(1)
+    fmt.setBorderStyle(QTextFrameFormat.BorderStyle.BorderStyle_Solid)
+    fmt.setBorderBrush(QColor("#e0e0e0" if is_assistant else "#d0d0d0"))
+    fmt.setBackground(QColor("#f0f8ff" if is_assistant else "#f5f5f5"))
+    return fmt
+
+@functools.lru_cache(maxsize=1)
+def header_formats():
+    """Character formats for a bubble's sender name and timestamp"""
+    sender_format = QTextCharFormat()
+    sender_format.setFont(QFont("Arial", 9, QFont.Weight.Bold))
+    time_format = QTextCharFormat()
+    time_format.setFont(QFont("Arial", 8))
+    time_format.setForeground(QColor("#666"))
+    return sender_format, time_format
+
+def excel_is_running():
+    """Cheap check for a running Excel, made before any COM attach.
+    
+    On Windows this looks for Excel's main window class; other platforms have
+    no equally cheap probe, so Excel is assumed to be there.
+    """
+    if sys.platform != 'win32':
+        return True
+    return bool(ctypes.windll.user32.FindWindowW("XLMAIN", None))
+
+def render_markdown(markdown):
+    """Render markdown to an HTML body fragment"""
+    doc = QTextDocument()
+    doc.setMarkdown(markdown)
+    rendered = doc.toHtml()
+    body_start = rendered.find('>', rendered.find('<body')) + 1
+    return rendered[body_start:rendered.rfind('</body>')]
+
+@functools.lru_cache(maxsize=256)
+def markdown_to_html(markdown):
+    """Render markdown once; repeated canned replies hit the cache"""
+    return render_markdown(markdown)
+
+class ChatTask(QRunnable):
+    """A single chat request, run on the chatbot's API thread pool"""
+    
+    def __init__(self, chatbot, request):
+        super().__init__()
+        self.chatbot = chatbot
+        self.request = request
+    
+    def run(self):
+        self.chatbot.process_request(self.request)
 
 class ExcelChatBot(QThread):
     message_received = pyqtSignal(str, str)  # message, sender
+    token_received = pyqtSignal(str)  # streamed chunk of the assistant reply
+    reply_finished = pyqtSignal(str)  # full chat reply; replaces any streamed preview
     error_occurred = pyqtSignal(str)
     progress_updated = pyqtSignal(int)
     status_updated = pyqtSignal(str)
+    progress_status = pyqtSignal(int, str)  # both at once for multi-step operations
+    
+    API_TIMEOUT = (5, 30)  # (connect, read) seconds; an unreachable host fails fast
     
     def __init__(self):
         super().__init__()
         self.api_key = os.getenv('OPENROUTER_API_KEY')
         self.api_url = "https://openrouter.ai/api/v1/chat/completions"
-        self.conversation_history = []
-        self.current_request = None
+        self._session = None
+        self._processor = None
+        self._processor_lock = threading.Lock()  # worker and status threads share it
+        self.conversation_history = deque(maxlen=20)  # only the recent turns are ever sent
+        self.requests = queue.Queue()  # pending Excel request dicts; None stops the worker
+        # Chat requests mostly talk to the API, so they run here instead of waiting
+        # behind Excel work; one thread keeps streamed replies in order
+        self.api_pool = QThreadPool()
+        self.api_pool.setMaxThreadCount(1)
         self.is_processing = False
         
+    @property
+    def session(self):
+        """Long-lived API session, created on first use so requests isn't imported at startup"""
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            # Successive API calls reuse the pooled TLS connection
+            session = requests.Session()
+            # Rate limits and gateway errors mean the request wasn't served, so they
+            # are safe to retry even for POST; Retry-After is honoured
+            retries = Retry(
+                total=2,
+                backoff_factor=0.5,
+                status_forcelist=(429, 502, 503, 504),
+                allowed_methods=frozenset({"POST"})
+            )
+            # One host, and API calls run one at a time on api_pool
+            session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retries))
+            session.headers.update({
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            })
+            self._session = session
+        return self._session
+    
+    @property
+    def processor(self):
+        """TrialBalanceProcessor, created on first use"""
+        if self._processor is None:
+            with self._processor_lock:
+                if self._processor is None:
+                    from excel_processor import TrialBalanceProcessor
+                    self._processor = TrialBalanceProcessor()
+        return self._processor
+    
     def handle_excel_request(self, request_type, data=None):
         """Handle different types of Excel requests"""
-        self.current_request = {
+        request = {
             'type': request_type,
             'data': data or {}
         }
-        if not self.isRunning():
-            self.start()
+        if request_type in ('chat', 'guide_update'):
+            self.api_pool.start(ChatTask(self, request))
+        else:
+            self.requests.put(request)
+    
+    def stop(self):
+        """Ask the worker to exit; long loops check isInterruptionRequested() between Excel/API calls"""
+        self.requestInterruption()
+        self.api_pool.clear()
+        self.requests.put(None)
+    
+    def close(self):
+        """Release pooled API connections; call once the worker and api_pool are done"""
+        if self._session is not None:
+            self._session.close()
     
     def run(self):
-        """Main thread execution"""
-        if not self.current_request:
-            return
-            
+        """Main thread execution: serve queued requests until stopped"""
+        while not self.isInterruptionRequested():
+            request = self.requests.get()
+            if request is None:
+                break
+            self.process_request(request)
+    
+    def process_request(self, request):
+        """Dispatch a single queued request"""
         try:
             self.is_processing = True
-            request_type = self.current_request['type']
-            data = self.current_request['data']
+            request_type = request['type']
+            data = request['data']
             
             if request_type == 'analyze_structure':
                 self.analyze_excel_structure()
@@ -56,6 +306,8 @@ class ExcelChatBot(QThread):
                 self.handle_chat_message(data.get('message', ''))
             elif request_type == 'perform_update':
                 self.perform_trial_balance_update(data)
+            elif request_type == 'autonomous':
+                self.run_autonomous_mode()
                 
         except Exception as e:
             self.error_occurred.emit(f"An error occurred: {str(e)}")
@@ -67,68 +319,39 @@ class ExcelChatBot(QThread):
         try:
             self.status_updated.emit("Analyzing Excel structure...")
             
-            # Check if Excel is running
-            try:
-                app = xw.App.active
-                if not app.books:
-                    self.message_received.emit(
-                        "❌ No Excel workbook is currently open. Please open a workbook and try again.",
-                        "assistant"
-                    )
-                    return
-                    
-                wb = app.books.active
-                ws = wb.sheets.active
-                
-                # Get basic info
-                workbook_name = wb.name
-                sheet_name = ws.name
-                
-                # Get all sheet names
-                sheet_names = [sheet.name for sheet in wb.sheets]
-                
-                # Get data range
-                used_range = ws.used_range
-                if used_range:
-                    rows = used_range.shape[0]
-                    cols = used_range.shape[1]
-                    
-                    # Get headers (first row)
-                    headers = []
-                    if rows > 0:
-                        first_row = ws.range(f"A1:{chr(64 + cols)}1").value
-                        if isinstance(first_row, list):
-                            headers = [str(cell) if cell is not None else f"Column {i+1}" for i, cell in enumerate(first_row)]
-                        else:
-                            headers = [str(first_row) if first_row is not None else "Column 1"]
-                else:
-                    rows = cols = 0
-                    headers = []
-                
-                # Format the analysis message
-                message = f"📊 **Excel Workbook Analysis**\n\n"
-                message += f"**Workbook:** {workbook_name}\n"
-                message += f"**Active Sheet:** {sheet_name}\n\n"
-                
-                message += "**Available Sheets:**\n"
-                for sheet in sheet_names:
-                    message += f"• {sheet}\n"
-                    
-                message += f"\n**Data Range:** {rows} rows × {cols} columns\n"
-                
-                if headers:
-                    message += "\n**Column Headers:**\n"
-                    for i, header in enumerate(headers, 1):
-                        message += f"{i}. {header}\n"
-                
-                self.message_received.emit(message, "assistant")
-                self.status_updated.emit("Analysis complete")
-                
-            except Exception as e:
+            # One batched probe instead of a COM round-trip per field
+            structure = self.processor.analyze_structure_batched()
+            
+            if structure['status'] == 'no_excel':
+                self.message_received.emit(
+                    "❌ No Excel workbook is currently open. Please open a workbook and try again.",
+                    "assistant"
+                )
+                return
+            
+            if structure['status'] != 'success':
                 self.message_received.emit(
-                    f"❌ Error accessing Excel: {str(e)}\n\nPlease make sure Excel is running with a workbook open.",
+                    f"❌ {structure['message']}\n\nPlease make sure Excel is running with a workbook open.",
                     "assistant"
                 )
+                return
+            
+            # Format the analysis message
+            parts = [
+                "📊 **Excel Workbook Analysis**\n\n",
+                f"**Workbook:** {structure['workbook_name']}\n",
+                f"**Active Sheet:** {structure['active_sheet']}\n\n",
+                "**Available Sheets:**\n"
+            ]
+            parts.extend(f"• {sheet}\n" for sheet in structure['sheets'])
+            parts.append(f"\n**Data Range:** {structure['rows']} rows × {structure['columns']} columns\n")
+            
+            if structure['headers']:
+                parts.append("\n**Column Headers:**\n")
+                parts.extend(f"{i}. {header}\n" for i, header in enumerate(structure['headers'], 1))
+            
+            self.message_received.emit("".join(parts), "assistant")
+            self.status_updated.emit("Analysis complete")
                 
         except Exception as e:
             self.error_occurred.emit(f"Failed to analyze Excel structure: {str(e)}")
@@ -145,14 +368,14 @@ class ExcelChatBot(QThread):
             context = {
                 'user_message': user_message,
                 'excel_info': excel_info,
-                'conversation_history': self.conversation_history[-5:]  # Last 5 messages for context
+                'conversation_history': self.recent_history(5)  # Last 5 messages for context
             }
             
             # Call OpenRouter API
             response = self.call_openrouter_api(context)
             
             if response:
-                self.message_received.emit(response, "assistant")
+                self.reply_finished.emit(response)
                 # Add to conversation history
                 self.conversation_history.append({
                     'role': 'user',
@@ -163,9 +386,8 @@ class ExcelChatBot(QThread):
                     'content': response
                 })
             else:
-                self.message_received.emit(
-                    "I'm having trouble connecting to the AI service. Please try again later.",
-                    "assistant"
+                self.reply_finished.emit(
+                    "I'm having trouble connecting to the AI service. Please try again later."
                 )
                 
             self.status_updated.emit("Ready")
@@ -178,99 +400,63 @@ class ExcelChatBot(QThread):
         try:
             self.status_updated.emit("Thinking...")
             
-            # Simple keyword-based responses for common queries
-            message_lower = message.lower()
-            
-            if any(word in message_lower for word in ['help', 'what can you do', 'commands']):
-                response = """🤖 **Excel Trial Balance Assistant**
-
-I can help you with:
-
-**📊 Analysis:**
-• Analyze Excel workbook structure
-• Identify trial balance data
-• Review column mappings
-
-**🔄 Updates:**
-• Guide you through trial balance updates
-• Perform automated updates with your approval
-• Verify update results
-
-**💬 Chat:**
-• Answer questions about Excel operations
-• Provide guidance on trial balance processes
-• Help troubleshoot issues
-
-**Commands:**
-• Type 'analyze' to analyze current workbook
-• Type 'update' to start update process
-• Ask any questions about your Excel data!"""
-                
-            elif 'analyze' in message_lower:
-                self.handle_excel_request('analyze_structure')
-                return
-                
-            elif 'update' in message_lower:
-                response = """🔄 **Trial Balance Update Process**
-
-To update your trial balance, I'll need to:
-
-1. **Analyze** your current Excel structure
-2. **Identify** trial balance columns (Account, Debit, Credit)
-3. **Map** your data to standard format
-4. **Preview** proposed changes
-5. **Execute** updates with your approval
-
-Would you like me to start by analyzing your current workbook structure?"""
-                
-            else:
-                # For other messages, try to use AI if available
-                if self.api_key:
-                    context = {
-                        'user_message': message,
-                        'conversation_history': self.conversation_history[-3:]
-                    }
-                    response = self.call_openrouter_api(context)
-                    if not response:
-                        response = "I'm here to help with Excel trial balance operations. Try asking about 'analyze', 'update', or 'help'."
-                else:
+            # Keyword queries are answered by the GUI; everything else goes to the AI if available
+            if self.api_key:
+                context = {
+                    'user_message': message,
+                    'conversation_history': self.recent_history(3)
+                }
+                response = self.call_openrouter_api(context)
+                if not response:
                     response = "I'm here to help with Excel trial balance operations. Try asking about 'analyze', 'update', or 'help'."
+            else:
+                response = "I'm here to help with Excel trial balance operations. Try asking about 'analyze', 'update', or 'help'."
             
-            self.message_received.emit(response, "assistant")
+            self.reply_finished.emit(response)
             self.status_updated.emit("Ready")
             
         except Exception as e:
             self.error_occurred.emit(f"Failed to process message: {str(e)}")
     
+    def recent_history(self, count):
+        """Return the last `count` conversation messages"""
+        if not self.conversation_history:
+            return []
+        start = max(0, len(self.conversation_history) - count)
+        return list(itertools.islice(self.conversation_history, start, None))
+    
+    def excel_app(self):
+        """Return the Excel application shared with the processor for this thread"""
+        from excel_processor import get_excel_app
+        return get_excel_app()
+    
+    def reset_excel_app(self):
+        """Drop this thread's cached Excel handle; returns True if one was cached"""
+        from excel_processor import reset_excel_app
+        return reset_excel_app()
+    
     def get_excel_status(self):
         """Get current Excel application status"""
-        try:
-            app = xw.App.active
-            if not app.books:
-                return {
-                    'has_excel': True,
-                    'has_workbook': False,
-                    'workbook_name': None,
-                    'sheet_names': [],
-                    'active_sheet': None
-                }
-                
-            wb = app.books.active
-            return {
-                'has_excel': True,
-                'has_workbook': True,
-                'workbook_name': wb.name,
-                'sheet_names': [sheet.name for sheet in wb.sheets],
-                'active_sheet': wb.sheets.active.name
-            }
-        except:
-            return {
-                'has_excel': False,
-                'has_workbook': False,
-                'workbook_name': None,
-                'sheet_names': [],
-                'active_sheet': None
-            }
+        no_excel = {
+            'has_excel': False,
+            'has_workbook': False,
+            'workbook_name': None,
+            'sheet_names': [],
+            'active_sheet': None
+        }
+        # Skip the COM attach (and the xlwings import) when Excel isn't running
+        if not excel_is_running():
+            self.reset_excel_app()
+            return no_excel
+        
+        while True:
+            try:
+                return self.processor.get_workbook_snapshot()
+            except Exception:
+                # A stale handle (Excel restarted) gets one fresh attach before giving up
+                if self.reset_excel_app():
+                    continue
+                return no_excel
     
     def call_openrouter_api(self, context):
         """Call OpenRouter API for AI responses"""
@@ -278,23 +464,12 @@ Would you like me to start by analyzing your current workbook structure?"""
             return None
             
         try:
-            # Prepare the prompt
-            system_prompt = """You are an Excel Trial Balance Assistant. You help users analyze and update Excel trial balance data.
-            
-Your capabilities include:
-- Analyzing Excel workbook structure
-- Identifying trial balance data patterns
-- Guiding users through update processes
-- Providing Excel-related advice
-
-Be helpful, concise, and focus on Excel trial balance operations. Use emojis and formatting to make responses clear and engaging."""
-            
             messages = [
-                {"role": "system", "content": system_prompt}
+                {"role": "system", "content": SYSTEM_PROMPT}
             ]
             
-            # Add conversation history
-            if 'conversation_history' in context:
+            # Add conversation history, if there is any yet
+            if context.get('conversation_history'):
                 messages.extend(context['conversation_history'])
                 
             # Add current message
@@ -303,19 +478,27 @@ Be helpful, concise, and focus on Excel trial balance operations. Use emojis and
                 "content": context['user_message']
             })
             
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
             data = {
                 "model": "anthropic/claude-3.5-sonnet",
                 "messages": messages,
                 "max_tokens": 1000,
-                "temperature": 0.7
+                "temperature": 0.7,
+                "stream": True
             }
             
-            response = requests.post(self.api_url, headers=headers, json=data, timeout=30)
+            response = self.session.post(self.api_url, json=data, timeout=self.API_TIMEOUT, stream=True)
+            
+            if response.status_code == 200:
+                # A server that ignores "stream" answers with a regular JSON completion
+                if 'text/event-stream' not in response.headers.get('Content-Type', ''):
+                    with response:
+                        return response.json()['choices'][0]['message']['content']
+                return self.read_streaming_response(response)
+            
+            # Fall back to a regular completion if streaming was rejected
+            response.close()
+            data["stream"] = False
+            response = self.session.post(self.api_url, json=data, timeout=self.API_TIMEOUT)
             
             if response.status_code == 200:
                 result = response.json()
@@ -326,137 +509,328 @@ Be helpful, concise, and focus on Excel trial balance operations. Use emojis and
         except Exception as e:
             return None
     
+    def read_streaming_response(self, response):
+        """Emit server-sent completion tokens as they arrive and return the full text"""
+        chunks = []
+        response.encoding = 'utf-8'
+        
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if self.isInterruptionRequested():
+                    break
+                # Skip blank separators and SSE comments (keep-alive pings)
+                if not line or not line.startswith('data:'):
+                    continue
+                    
+                payload = line[len('data:'):].strip()
+                if payload == '[DONE]':
+                    break
+                    
+                choices = json.loads(payload).get('choices') or []
+                token = choices[0].get('delta', {}).get('content') if choices else None
+                if token:
+                    chunks.append(token)
+                    self.token_received.emit(token)
+        
+        return ''.join(chunks) or None
+    
     def perform_trial_balance_update(self, update_data):
         """Perform the actual trial balance update"""
+        from excel_processor import excel_batch, get_sheet_names
         try:
-            self.status_updated.emit("Performing trial balance update...")
-            self.progress_updated.emit(10)
+            self.progress_status.emit(10, "Performing trial balance update...")
             
             # Get Excel app and workbook
-            app = xw.App.active
+            app = self.excel_app()
             wb = app.books.active
             
-            # Extract update parameters
-            sheet_name = update_data.get('sheet_name')
-            column_mapping = update_data.get('column_mapping', {})
-            updates = update_data.get('updates', [])
+            # Extract update parameters
+            sheet_name = update_data.get('sheet_name')
+            column_mapping = update_data.get('column_mapping', {})
+            updates = update_data.get('updates', [])
+            
+            if not updates:
+                self.error_occurred.emit("No updates to perform")
+                return
+                
+            # Get the target sheet
+            if sheet_name and sheet_name in get_sheet_names(wb):
+                ws = wb.sheets[sheet_name]
+            else:
+                ws = wb.sheets.active
+                
+            self.progress_status.emit(30, "Writing updated amounts...")
+            
+            # Perform updates
+            updated_accounts = []
+            failed_accounts = []
+            
+            # Batch mode keeps Excel from repainting/recalculating per write
+            with excel_batch(app):
+                for update in updates:
+                    if self.isInterruptionRequested():
+                        break
+                    try:
+                        account_name = update.get('account')
+                        new_amount = update.get('amount')
+                        row_number = update.get('row')
+                        
+                        if row_number and new_amount is not None:
+                            # Update the amount in the specified row
+                            amount_col = column_mapping.get('amount', 'C')  # Default to column C
+                            cell_address = f"{amount_col}{row_number}"
+                            ws.range(cell_address).value = new_amount
+                            updated_accounts.append(account_name)
+                        else:
+                            failed_accounts.append(account_name)
+                            
+                    except Exception as e:
+                        failed_accounts.append(f"{account_name} (Error: {str(e)})")
+            
+            # A cancelled run is only partly written, so don't save it or report success
+            if self.isInterruptionRequested():
+                self.message_received.emit(
+                    f"⏹️ Update cancelled after {len(updated_accounts)} of {len(updates)} accounts; "
+                    "the workbook was not saved.", "assistant")
+                return
+            
+            self.progress_status.emit(80, "Saving workbook...")
+            
+            # Save the workbook
+            wb.save()
+            
+            # Report results
+            parts = [
+                "✅ **Update Successful!**\n\n",
+                f"**Updated {len(updated_accounts)} accounts:**\n"
+            ]
+            parts.extend(f"• {account}\n" for account in updated_accounts)
+                
+            if failed_accounts:
+                parts.append(f"\n**⚠️ Failed to update {len(failed_accounts)} accounts:**\n")
+                parts.extend(f"• {account}\n" for account in failed_accounts)
+                    
+            self.message_received.emit("".join(parts), "assistant")
+            self.progress_status.emit(100, "Update complete")
+            
+        except Exception as e:
+            self.reset_excel_app()
+            self.error_occurred.emit(f"Update failed: {str(e)}")
+    
+    def run_autonomous_mode(self):
+        """Detect trial balance sheets and their column mappings (autonomous mode)"""
+        try:
+            self.status_updated.emit("Running autonomous mode...")
+            
+            # Step 1: Detect Excel and sheets
+            excel_status = self.get_excel_status()
+            if not excel_status['has_excel'] or not excel_status['has_workbook']:
+                self.message_received.emit("❌ Please ensure Excel is running with a workbook open.", "assistant")
+                return
+            
+            # Step 2: Auto-detect trial balance sheets
+            trial_balance_sheets = self.auto_detect_sheets(excel_status['sheet_names'])
+            
+            if not trial_balance_sheets:
+                self.message_received.emit("❌ No trial balance sheets detected. Please ensure your workbook contains trial balance data.", "assistant")
+                return
+            
+            self.message_received.emit(f"📊 Detected {len(trial_balance_sheets)} potential trial balance sheet(s): {', '.join(trial_balance_sheets)}", "assistant")
+            
+            # Step 3: Process each sheet
+            for sheet_name in trial_balance_sheets:
+                if self.isInterruptionRequested():
+                    return
+                self.message_received.emit(f"🔍 Analyzing sheet: {sheet_name}", "assistant")
+                
+                # Auto-detect columns
+                column_mapping = self.auto_detect_columns(sheet_name)
+                
+                if not column_mapping:
+                    self.message_received.emit(f"⚠️ Could not detect trial balance columns in sheet '{sheet_name}'. Skipping...", "assistant")
+                    continue
+                
+                self.message_received.emit(f"✅ Column mapping detected for '{sheet_name}': {column_mapping}", "assistant")
+                
+                # Preview changes (simplified for autonomous mode)
+                self.message_received.emit(f"📋 Sheet '{sheet_name}' is ready for updates. Column mapping: {column_mapping}", "assistant")
+            
+            self.message_received.emit("🎉 Autonomous analysis complete! Use the update commands to proceed with modifications.", "assistant")
+            self.status_updated.emit("Autonomous mode complete")
+            
+        except Exception as e:
+            self.message_received.emit(f"❌ Error in autonomous mode: {str(e)}", "assistant")
+            self.status_updated.emit("Ready")
+    
+    def auto_detect_sheets(self, sheet_names):
+        """Auto-detect sheets that likely contain trial balance data"""
+        trial_balance_keywords = [
+            'trial', 'balance', 'tb', 'trial balance', 'trialbalance',
+            'accounts', 'ledger', 'general ledger', 'gl', 'chart of accounts'
+        ]
+        
+        detected_sheets = []
+        
+        from excel_processor import get_used_range
+        try:
+            wb = self.excel_app().books.active
+        except Exception:
+            self.reset_excel_app()
+            wb = None
+        
+        for sheet_name in sheet_names:
+            if self.isInterruptionRequested():
+                break
+            # Blank sheets can't hold a trial balance, whatever they are called
+            ws = used_range = None
+            if wb is not None:
+                try:
+                    ws = wb.sheets[sheet_name]
+                    used_range = get_used_range(ws)
+                    if used_range is None:
+                        continue
+                except Exception:
+                    ws = None
+            
+            sheet_lower = sheet_name.lower()
+            
+            # Check for keywords
+            for keyword in trial_balance_keywords:
+                if keyword in sheet_lower:
+                    detected_sheets.append(sheet_name)
+                    break
+            
+            # Also check sheet structure (if it has typical trial balance columns)
+            if used_range is None:
+                continue
+            try:
+                # Get first few rows to check for typical headers
+                if used_range.shape[0] > 0:
+                    first_row = ws.range((1, 1), (1, min(10, used_range.shape[1]))).options(ndim=1).value
+                    headers = [str(cell).lower() if cell else '' for cell in first_row]
+                    
+                    # Check for typical trial balance headers
+                    account_found = any('account' in h or 'name' in h for h in headers)
+                    amount_found = any(word in h for h in headers for word in ['debit', 'credit', 'balance', 'amount'])
+                    
+                    if account_found and amount_found and sheet_name not in detected_sheets:
+                        detected_sheets.append(sheet_name)
+                        
+            except Exception:
+                continue  # Skip sheets that can't be analyzed
+        
+        return detected_sheets
+    
+    def auto_detect_columns(self, sheet_name):
+        """Auto-detect column mapping for a trial balance sheet"""
+        from excel_processor import get_used_range
+        try:
+            app = self.excel_app()
+            wb = app.books.active
+            ws = wb.sheets[sheet_name]
+            
+            used_range = get_used_range(ws)
+            if used_range is None:
+                return None
+            
+            # Read every candidate header row (the first few rows) in a single call
+            candidate_rows = ws.range(
+                (1, 1), (min(3, used_range.shape[0]), min(20, used_range.shape[1]))
+            ).options(ndim=2).value
+            
+            # Get headers (try first few rows)
+            headers = []
+            for row_data in candidate_rows:
+                potential_headers = [str(cell) if cell else '' for cell in row_data]
+                
+                # Check if this looks like a header row
+                if any(word in h.lower() for h in potential_headers for word in ['account', 'debit', 'credit', 'balance']):
+                    headers = potential_headers
+                    break
+            
+            if not headers:
+                return None
+            
+            # Map columns based on keywords
+            column_mapping = {}
             
-            if not updates:
-                self.error_occurred.emit("No updates to perform")
-                return
+            for i, header in enumerate(headers):
+                header_lower = header.lower()
+                col_letter = chr(65 + i)  # A, B, C, etc.
                 
-            # Get the target sheet
-            if sheet_name and sheet_name in [s.name for s in wb.sheets]:
-                ws = wb.sheets[sheet_name]
-            else:
-                ws = wb.sheets.active
+                # Account column
+                if any(word in header_lower for word in ['account', 'name', 'description']):
+                    if 'account' not in column_mapping:
+                        column_mapping['account'] = col_letter
                 
-            self.progress_updated.emit(30)
-            
-            # Perform updates
-            updated_accounts = []
-            failed_accounts = []
-            
-            for update in updates:
-                try:
-                    account_name = update.get('account')
-                    new_amount = update.get('amount')
-                    row_number = update.get('row')
-                    
-                    if row_number and new_amount is not None:
-                        # Update the amount in the specified row
-                        amount_col = column_mapping.get('amount', 'C')  # Default to column C
-                        cell_address = f"{amount_col}{row_number}"
-                        ws.range(cell_address).value = new_amount
-                        updated_accounts.append(account_name)
-                    else:
-                        failed_accounts.append(account_name)
-                        
-                except Exception as e:
-                    failed_accounts.append(f"{account_name} (Error: {str(e)})")
+                # Debit column
+                elif 'debit' in header_lower:
+                    column_mapping['debit'] = col_letter
+                
+                # Credit column
+                elif 'credit' in header_lower:
+                    column_mapping['credit'] = col_letter
+                
+                # Balance column
+                elif 'balance' in header_lower:
+                    column_mapping['balance'] = col_letter
+                
+                # Amount column (generic)
+                elif 'amount' in header_lower and 'debit' not in column_mapping and 'credit' not in column_mapping:
+                    column_mapping['amount'] = col_letter
             
-            self.progress_updated.emit(80)
+            # Fallback: if we found account but no debit/credit, look for numeric columns
+            if 'account' in column_mapping and 'debit' not in column_mapping and 'credit' not in column_mapping:
+                # Find numeric columns after the account column, sampling row 2
+                # from the rows already read above
+                account_col_index = ord(column_mapping['account']) - 65
+                sample_row = candidate_rows[1] if len(candidate_rows) > 1 else []
+                
+                for i in range(account_col_index + 1, min(len(headers), len(sample_row))):
+                    col_letter = chr(65 + i)
+                    # Check if this column contains numeric data
+                    sample_value = sample_row[i]
+                    if isinstance(sample_value, (int, float)):
+                        if 'debit' not in column_mapping:
+                            column_mapping['debit'] = col_letter
+                        elif 'credit' not in column_mapping:
+                            column_mapping['credit'] = col_letter
+                            break
             
-            # Save the workbook
-            wb.save()
+            # Return mapping if we found at least account column
+            if 'account' in column_mapping:
+                return column_mapping
             
-            # Report results
-            message = f"✅ **Update Successful!**\n\n"
-            message += f"**Updated {len(updated_accounts)} accounts:**\n"
-            for account in updated_accounts:
-                message += f"• {account}\n"
-                
-            if failed_accounts:
-                message += f"\n**⚠️ Failed to update {len(failed_accounts)} accounts:**\n"
-                for account in failed_accounts:
-                    message += f"• {account}\n"
-                    
-            self.message_received.emit(message, "assistant")
-            self.progress_updated.emit(100)
-            self.status_updated.emit("Update complete")
+            return None
             
         except Exception as e:
-            self.error_occurred.emit(f"Update failed: {str(e)}")
+            self.reset_excel_app()
+            return None
 
-class ChatMessage(QFrame):
-    """Individual chat message widget"""
+class ExcelStatusWorker(QObject):
+    """Probes Excel status on its own thread so a busy Excel never blocks the GUI"""
+    
+    status_ready = pyqtSignal(dict)
     
-    def __init__(self, message, sender, timestamp=None):
+    STATUS_TTL = 2.0  # seconds a status is reused, so back-to-back checks skip COM
+    
+    def __init__(self, chatbot):
         super().__init__()
-        self.message = message
-        self.sender = sender
-        self.timestamp = timestamp or datetime.now().strftime("%H:%M")
-        self.setup_ui()
-        
-    def setup_ui(self):
-        """Setup the message UI"""
-        layout = QVBoxLayout()
-        layout.setContentsMargins(10, 5, 10, 5)
-        
-        # Message header
-        header_layout = QHBoxLayout()
-        
-        sender_label = QLabel(f"{'🤖 Assistant' if self.sender == 'assistant' else '👤 You'}")
-        sender_label.setFont(QFont("Arial", 9, QFont.Weight.Bold))
-        
-        time_label = QLabel(self.timestamp)
-        time_label.setFont(QFont("Arial", 8))
-        time_label.setStyleSheet("color: #666;")
-        
-        header_layout.addWidget(sender_label)
-        header_layout.addStretch()
-        header_layout.addWidget(time_label)
-        
-        # Message content
-        content_label = QTextBrowser()
-        content_label.setMarkdown(self.message)
-        content_label.setMaximumHeight(200)
-        content_label.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAsNeeded)
-        content_label.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        
-        # Style the message based on sender
-        if self.sender == "assistant":
-            self.setStyleSheet("""
-                QFrame {
-                    background-color: #f0f8ff;
-                    border: 1px solid #e0e0e0;
-                    border-radius: 8px;
-                    margin: 2px;
-                }
-            """)
-        else:
-            self.setStyleSheet("""
-                QFrame {
-                    background-color: #f5f5f5;
-                    border: 1px solid #d0d0d0;
-                    border-radius: 8px;
-                    margin: 2px;
-                }
-            """)
-            
-        layout.addLayout(header_layout)
-        layout.addWidget(content_label)
-        self.setLayout(layout)
+        self.chatbot = chatbot
+        self._last_status = None  # (time.monotonic(), status dict)
+    
+    @pyqtSlot()
+    def probe(self):
+        """Query Excel (or reuse a status from the last STATUS_TTL seconds) and report it"""
+        now = time.monotonic()
+        if self._last_status is None or now - self._last_status[0] >= self.STATUS_TTL:
+            self._last_status = (now, self.chatbot.get_excel_status())
+        self.status_ready.emit(self._last_status[1])
+    
+    @pyqtSlot()
+    def invalidate(self):
+        """Forget the memoized status so the next probe queries Excel"""
+        self._last_status = None
 
 class ExcelChatBotGUI(QMainWindow):
     """Main GUI application for Excel ChatBot"""
@@ -464,20 +838,45 @@ class ExcelChatBotGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.chatbot = ExcelChatBot()
+        self.chatbot.start()
+        self._status_thread = QThread(self)
+        self._status_worker = ExcelStatusWorker(self.chatbot)
+        self._status_worker.moveToThread(self._status_thread)
+        self._status_worker.status_ready.connect(self._render_status)
+        self._status_thread.start()
+        self.streaming_cursor = None  # cursor inside the assistant reply being streamed
+        self._stream_body_start = 0
+        self._pending_msgs = []  # (message, sender, is_html) waiting for the next flush
+        self._collapsed = {}  # expand-link token -> (cursor inside the bubble, full markdown)
+        self._last_error = (None, 0.0)  # (message, time.monotonic()) of the last error shown
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._flush_messages)
+        # Status probes requested together collapse into one run of this timer
+        self._status_timer = QTimer(self)
+        self._status_timer.setSingleShot(True)
+        self._status_timer.timeout.connect(self._probe_excel_status)
+        self._pending_progress = -1  # latest worker progress not yet shown
+        self._pending_status = None  # latest worker status text not yet shown
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setSingleShot(True)
+        self._progress_timer.setInterval(33)  # at most ~30 progress/status repaints a second
+        self._progress_timer.timeout.connect(self._flush_progress)
+        self._sheet_dialog = None  # dialogs are built on first use, then reused
+        self._mapping_dialog = None
         self.setup_ui()
         self.setup_connections()
         
+        # Warm the HTML cache with the canned replies
+        for canned_message in (HELP_MESSAGE, UPDATE_GUIDE_MESSAGE, CHAT_CLEARED_MESSAGE):
+            markdown_to_html(canned_message)
+        
         # Welcome message
-        self.add_message(
-            "👋 Welcome to Excel Trial Balance Assistant!\n\n" +
-            "I can help you analyze and update Excel trial balance data. " +
-            "Type 'help' to see what I can do, or 'analyze' to start analyzing your current workbook.",
-            "assistant"
-        )
+        self.add_message(WELCOME_MESSAGE, "assistant")
         
     def setup_ui(self):
         """Setup the main user interface"""
-        self.setWindowTitle("Excel Trial Balance ChatBot")
+        self.setWindowTitle(APP_NAME)
         self.setGeometry(100, 100, 1000, 700)
         
         # Central widget
@@ -523,19 +922,22 @@ class ExcelChatBotGUI(QMainWindow):
         title_label.setStyleSheet("padding: 10px; background-color: #f0f0f0; border-radius: 5px;")
         layout.addWidget(title_label)
         
-        # Chat messages area
-        self.chat_scroll = QScrollArea()
-        self.chat_scroll.setWidgetResizable(True)
-        self.chat_scroll.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        self.chat_scroll.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        # Chat transcript: a single document holds every message
+        self.chat_view = QTextBrowser()
+        # Links are handled here: web links open in the browser, EXPAND_SCHEME links
+        # show a collapsed message in full
+        self.chat_view.setOpenLinks(False)
+        self.chat_view.anchorClicked.connect(self._on_chat_link)
+        self.chat_view.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
+        self.chat_view.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
         
-        # Chat messages container
-        self.chat_container = QWidget()
-        self.chat_layout = QVBoxLayout(self.chat_container)
-        self.chat_layout.addStretch()
-        self.chat_scroll.setWidget(self.chat_container)
+        # Follow new content only while the view is scrolled to the bottom
+        self._autoscroll = True
+        scrollbar = self.chat_view.verticalScrollBar()
+        scrollbar.valueChanged.connect(self._on_chat_scrolled)
+        scrollbar.rangeChanged.connect(self._on_chat_range_changed)
         
-        layout.addWidget(self.chat_scroll)
+        layout.addWidget(self.chat_view)
         
         # Input area
         input_layout = QHBoxLayout()
@@ -649,21 +1051,39 @@ class ExcelChatBotGUI(QMainWindow):
         self.analyze_button.clicked.connect(self.analyze_excel)
         self.update_button.clicked.connect(self.start_update_process)
         self.clear_button.clicked.connect(self.clear_chat)
-        self.refresh_status_button.clicked.connect(self.refresh_excel_status)
-        
-        # ChatBot connections
-        self.chatbot.message_received.connect(self.add_message)
-        self.chatbot.error_occurred.connect(self.show_error)
-        self.chatbot.progress_updated.connect(self.update_progress)
-        self.chatbot.status_updated.connect(self.update_status)
+        self.refresh_status_button.clicked.connect(self.recheck_excel_status)
+        
+        # ChatBot connections; these are emitted from worker threads, so they are queued
+        # explicitly rather than left to AutoConnection's per-emit thread check
+        queued = Qt.ConnectionType.QueuedConnection
+        self.chatbot.message_received.connect(self.add_message, queued)
+        self.chatbot.token_received.connect(self.append_stream_token, queued)
+        self.chatbot.reply_finished.connect(self.finish_reply, queued)
+        self.chatbot.error_occurred.connect(self.show_error, queued)
+        self.chatbot.progress_updated.connect(self.update_progress, queued)
+        self.chatbot.status_updated.connect(self.update_status, queued)
+        self.chatbot.progress_status.connect(self.update_progress_status, queued)
+        # A failed request may mean Excel went away, so don't trust the memoized status
+        self.chatbot.error_occurred.connect(self.recheck_excel_status, queued)
+        
+        # Whole-message chat commands, resolved with a single lookup in send_message
+        self._commands = {
+            command: handler
+            for commands, handler in (
+                (CLEAR_COMMANDS, self.clear_chat),
+                (STATUS_COMMANDS, self.refresh_excel_status),
+                (HELP_KEYWORDS, self.show_help),
+                (ANALYZE_COMMANDS, self.analyze_excel),
+                (UPDATE_COMMANDS, self.start_update_process),
+            )
+            for command in commands
+        }
         
-        # Timer for periodic status updates
-        self.status_timer = QTimer()
-        self.status_timer.timeout.connect(self.refresh_excel_status)
-        self.status_timer.start(5000)  # Update every 5 seconds
+        # Excel status is refreshed on user actions rather than polled, since each
+        # check is a COM round-trip
         
         # Initial status check
-        QTimer.singleShot(1000, self.refresh_excel_status)
+        self._status_timer.start(1000)
     
     def send_message(self):
         """Send a message to the chatbot"""
@@ -671,77 +1091,233 @@ class ExcelChatBotGUI(QMainWindow):
         if not message:
             return
             
-        # Add user message to chat
+        # Add user message to chat, jumping back to the latest messages
+        self._autoscroll = True
         self.add_message(message, "user")
         self.message_input.clear()
         
         # Handle special commands
         message_lower = message.lower()
-        
-        if message_lower in ['clear', 'clear chat']:
-            self.clear_chat()
-            return
-        elif message_lower in ['status', 'excel status']:
-            self.refresh_excel_status()
+        command = self._commands.get(message_lower)
+        if command:
+            command()
             return
-        elif message_lower in ['help', 'commands']:
-            self.chatbot.handle_excel_request('chat', {'message': 'help'})
+        
+        # Keyword replies are constant, so answer them here instead of queueing a request
+        tokens = set(re.findall(r"\w+", message_lower))
+        if tokens & HELP_KEYWORDS or HELP_PHRASES.search(message_lower):
+            self.show_help()
             return
-        elif message_lower in ['analyze', 'analyze excel']:
+        elif tokens & ANALYZE_KEYWORDS:
             self.analyze_excel()
             return
-        elif message_lower in ['update', 'start update']:
-            self.start_update_process()
+        elif tokens & UPDATE_KEYWORDS:
+            self.add_message(UPDATE_GUIDE_MESSAGE, "assistant")
+            return
+        
+        small_talk = SMALL_TALK.fullmatch(message)
+        if small_talk:
+            self.add_message(SMALL_TALK_REPLIES[small_talk.lastgroup], "assistant")
             return
         
         # Send to chatbot for processing
         self.chatbot.handle_excel_request('chat', {'message': message})
     
-    def add_message(self, message, sender):
-        """Add a message to the chat"""
-        chat_message = ChatMessage(message, sender)
+    def show_help(self):
+        """Show the list of things the assistant can do"""
+        self.add_message(HELP_MESSAGE, "assistant")
+    
+    def add_message(self, message, sender, is_html=False):
+        """Queue a markdown (or ready-made HTML) message; bursts are rendered together on the next idle tick"""
+        self._pending_msgs.append((message, sender, is_html))
+        if not self._flush_timer.isActive():
+            self._flush_timer.start(0)
+    
+    def _flush_messages(self):
+        """Render all queued messages in a single layout pass"""
+        if not self._pending_msgs:
+            return
+            
+        pending, self._pending_msgs = self._pending_msgs, []
+        
+        self.chat_view.setUpdatesEnabled(False)
+        # One edit block, so the document is re-laid out once for the whole batch
+        edit = QTextCursor(self.chat_view.document())
+        edit.beginEditBlock()
+        try:
+            for message, sender, is_html in pending:
+                cursor = self.insert_message_block(sender)
+                if is_html:
+                    cursor.insertHtml(message)
+                elif len(message) > COLLAPSE_CHARS:
+                    self.insert_collapsed(cursor, message)
+                else:
+                    cursor.insertHtml(markdown_to_html(message))
+        finally:
+            edit.endEditBlock()
+            self._trim_transcript()
+            self.chat_view.setUpdatesEnabled(True)
+    
+    def insert_collapsed(self, cursor, message):
+        """Render the start of a long message plus a link that expands it in place"""
+        # Cut at a paragraph break where possible so tables and lists stay intact
+        cut = message.rfind("\n\n", 0, COLLAPSE_CHARS)
+        preview = message[:cut if cut > 0 else COLLAPSE_CHARS]
+        
+        # A cursor follows later edits, so it still finds the bubble when the link is clicked
+        token = secrets.token_urlsafe(16)
+        self._collapsed[token] = (QTextCursor(cursor), message)
+        # The preview is unique text, so it is rendered directly rather than cached
+        cursor.insertHtml(render_markdown(preview))
+        cursor.insertHtml(f'<p><a href="{EXPAND_SCHEME}:{token}">Show more…</a></p>')
+    
+    def _on_chat_link(self, url):
+        """Expand a collapsed message, or open any other link externally"""
+        if url.scheme() != EXPAND_SCHEME:
+            QDesktopServices.openUrl(url)
+            return
+        
+        # Unknown or stale tokens (e.g. a link copied into a reply) are ignored
+        entry = self._collapsed.pop(url.path(), None)
+        if entry is None:
+            return
+        bubble_cursor, message = entry
+        
+        # Replace everything after the header block with the full message
+        cell = bubble_cursor.currentTable().cellAt(0, 0)
+        cursor = QTextCursor(self.chat_view.document())
+        cursor.setPosition(cell.firstCursorPosition().block().next().position())
+        cursor.setPosition(cell.lastCursorPosition().position(), QTextCursor.MoveMode.KeepAnchor)
+        cursor.beginEditBlock()
+        cursor.removeSelectedText()
+        cursor.insertHtml(render_markdown(message))
+        cursor.endEditBlock()
+    
+    def _trim_transcript(self):
+        """Drop the oldest message bubbles beyond MAX_CHAT_MESSAGES"""
+        # The streamed reply is tracked by position, so leave the document alone meanwhile
+        if self.streaming_cursor is not None:
+            return
+        
+        bubbles = self.chat_view.document().rootFrame().childFrames()
+        excess = len(bubbles) - MAX_CHAT_MESSAGES
+        if excess > 0:
+            dropped = bubbles[:excess]
+            self._collapsed = {
+                token: entry for token, entry in self._collapsed.items()
+                if entry[0].currentTable() not in dropped
+            }
+            cursor = QTextCursor(self.chat_view.document())
+            cursor.setPosition(bubbles[excess - 1].lastPosition() + 1, QTextCursor.MoveMode.KeepAnchor)
+            cursor.removeSelectedText()
+    
+    def insert_message_block(self, sender, timestamp=None):
+        """Append an empty message bubble to the transcript and return a cursor inside it"""
+        timestamp = timestamp or datetime.now().strftime("%H:%M")
+        is_assistant = sender == "assistant"
+        
+        cursor = QTextCursor(self.chat_view.document())
+        cursor.movePosition(QTextCursor.MoveOperation.End)
+        bubble = cursor.insertTable(1, 1, bubble_format(is_assistant))
+        
+        # Message header
+        cell_cursor = bubble.cellAt(0, 0).firstCursorPosition()
+        sender_label = '🤖 Assistant' if is_assistant else '👤 You'
+        sender_format, time_format = header_formats()
+        cell_cursor.insertText(sender_label, sender_format)
+        cell_cursor.insertText(f"\u00a0\u00a0{timestamp}", time_format)
+        cell_cursor.insertBlock()
+        cell_cursor.setCharFormat(QTextCharFormat())
+        
+        return cell_cursor
+    
+    def append_stream_token(self, token):
+        """Append a streamed token to the assistant reply in progress"""
+        # Keep queued messages (e.g. the user's prompt) above the reply
+        self._flush_messages()
+        
+        if self.streaming_cursor is None:
+            self.streaming_cursor = self.insert_message_block("assistant")
+            self._stream_body_start = self.streaming_cursor.position()
         
-        # Insert before the stretch
-        self.chat_layout.insertWidget(self.chat_layout.count() - 1, chat_message)
+        self.streaming_cursor.insertText(token)
+    
+    def finish_reply(self, message):
+        """Replace the streamed preview with the rendered reply, or add it as a new message"""
+        if self.streaming_cursor is None:
+            self.add_message(message, "assistant")
+            return
         
-        # Scroll to bottom
-        QTimer.singleShot(100, self.scroll_to_bottom)
+        cursor = self.streaming_cursor
+        cursor.setPosition(self._stream_body_start, QTextCursor.MoveMode.KeepAnchor)
+        cursor.removeSelectedText()
+        cursor.insertHtml(markdown_to_html(message))
+        self.streaming_cursor = None
     
-    def scroll_to_bottom(self):
-        """Scroll chat to bottom"""
-        scrollbar = self.chat_scroll.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+    def _on_chat_scrolled(self, value):
+        """Remember whether the user is reading the latest messages"""
+        self._autoscroll = value >= self.chat_view.verticalScrollBar().maximum()
+    
+    def _on_chat_range_changed(self, minimum, maximum):
+        """Keep the newest message in view as the transcript grows"""
+        if self._autoscroll:
+            self.chat_view.verticalScrollBar().setValue(maximum)
     
     def clear_chat(self):
         """Clear all chat messages"""
-        # Remove all message widgets except the stretch
-        for i in reversed(range(self.chat_layout.count() - 1)):
-            child = self.chat_layout.itemAt(i).widget()
-            if child:
-                child.setParent(None)
+        self.streaming_cursor = None
+        self._pending_msgs.clear()
+        self._collapsed.clear()
+        # Keep painting off until _flush_messages has rendered the welcome
+        # message, so clearing and refilling costs a single repaint
+        self.chat_view.setUpdatesEnabled(False)
+        self.chat_view.clear()
         
         # Add welcome message back
-        self.add_message(
-            "👋 Chat cleared! I'm ready to help with your Excel trial balance operations.",
-            "assistant"
-        )
+        self.add_message(CHAT_CLEARED_MESSAGE, "assistant")
+    
+    def closeEvent(self, event):
+        """Stop the chatbot worker before the window closes"""
+        self.chatbot.stop()
+        # Give the current Excel call a chance to finish; a stuck COM call is left to
+        # die with the process rather than terminated mid-call
+        if not self.chatbot.wait(2000):
+            logger.warning("Chatbot worker still busy after 2s; closing without it")
+        self.chatbot.api_pool.waitForDone(3000)
+        self.chatbot.close()
+        self._status_thread.quit()
+        if not self._status_thread.wait(2000):
+            logger.warning("Excel status thread still busy after 2s; closing without it")
+        super().closeEvent(event)
     
     def analyze_excel(self):
         """Analyze Excel structure"""
+        self.refresh_excel_status()
         self.chatbot.handle_excel_request('analyze_structure')
     
     def start_update_process(self):
         """Start the trial balance update process"""
+        self.refresh_excel_status()
         self.add_message("Starting trial balance update process...", "user")
-        self.chatbot.handle_excel_request('chat', {
-            'message': 'I want to update my trial balance. Please guide me through the process.'
-        })
+        self.add_message(UPDATE_GUIDE_MESSAGE, "assistant")
     
     def refresh_excel_status(self):
-        """Refresh Excel status display"""
+        """Refresh Excel status display on the next event loop pass"""
+        self._status_timer.start(0)
+    
+    @pyqtSlot()
+    def recheck_excel_status(self):
+        """Refresh Excel status without reusing the status worker's recent result"""
+        QMetaObject.invokeMethod(self._status_worker, "invalidate", Qt.ConnectionType.QueuedConnection)
+        self.refresh_excel_status()
+    
+    def _probe_excel_status(self):
+        """Ask the status thread for a fresh Excel status"""
+        QMetaObject.invokeMethod(self._status_worker, "probe", Qt.ConnectionType.QueuedConnection)
+    
+    def _render_status(self, status):
+        """Show a status dict from the status worker in the status label"""
         try:
-            status = self.chatbot.get_excel_status()
-            
             if not status['has_excel']:
                 status_text = "❌ Excel not detected"
                 color = "#ffebee"
@@ -760,22 +1336,52 @@ class ExcelChatBotGUI(QMainWindow):
             self.excel_status_label.setStyleSheet("padding: 5px; background-color: #ffebee; border-radius: 3px;")
     
     def show_error(self, error_message):
-        """Show error message"""
-        self.add_message(f"❌ **Error:** {error_message}", "assistant")
+        """Show error message; an identical error repeated within ERROR_REPEAT_WINDOW is only logged"""
+        logger.error(error_message)
+        now = time.monotonic()
+        last_message, last_time = self._last_error
+        if error_message == last_message and now - last_time < ERROR_REPEAT_WINDOW:
+            return
+        self._last_error = (error_message, now)
+        
+        escaped = html.escape(error_message).replace("\n", "<br>")
+        self.add_message(ERROR_PREFIX_HTML + escaped, "assistant", is_html=True)
         QMessageBox.warning(self, "Error", error_message)
     
     def update_progress(self, value):
-        """Update progress bar"""
+        """Record the latest progress; the bar is repainted by _flush_progress"""
+        self._pending_progress = value
+        if not self._progress_timer.isActive():
+            self._progress_timer.start()
+    
+    def _flush_progress(self):
+        """Apply the most recent status text and progress value"""
+        status, self._pending_status = self._pending_status, None
+        if status is not None and status != self.status_bar.currentMessage():
+            self.status_bar.showMessage(status)
+        
+        value, self._pending_progress = self._pending_progress, -1
+        if value < 0:
+            return
         if value > 0:
             self.progress_bar.setVisible(True)
-            self.progress_bar.setValue(value)
+            if self.progress_bar.value() != value:
+                self.progress_bar.setValue(value)
         else:
             self.progress_bar.setVisible(False)
     
+    def update_progress_status(self, value, status):
+        """Apply a combined progress/status step from the worker"""
+        self.update_status(status)
+        self.update_progress(value)
+    
     def update_status(self, status):
-        """Update status bar"""
-        self.status_bar.showMessage(status)
-        if status.lower() in ['ready', 'complete']:
+        """Record the latest status for _flush_progress; idle statuses hide the progress bar at once"""
+        self._pending_status = status
+        if not self._progress_timer.isActive():
+            self._progress_timer.start()
+        if status.casefold() in IDLE_STATUSES:
+            self._pending_progress = -1
             self.progress_bar.setVisible(False)
     
     def show_table_data(self, data, title="Table Data"):
@@ -795,20 +1401,19 @@ class ExcelChatBotGUI(QMainWindow):
             headers = list(data[0].keys()) if isinstance(data[0], dict) else [f"Column {i+1}" for i in range(len(data[0]))]
             
             # Create markdown table
-            markdown = "| " + " | ".join(headers) + " |\n"
-            markdown += "| " + " | ".join(["---"] * len(headers)) + " |\n"
+            lines = ["| " + " | ".join(headers) + " |", "| " + " | ".join(["---"] * len(headers)) + " |"]
             
             for row in data[:50]:  # Limit to first 50 rows
                 if isinstance(row, dict):
                     values = [str(row.get(header, "")) for header in headers]
                 else:
                     values = [str(cell) for cell in row]
-                markdown += "| " + " | ".join(values) + " |\n"
+                lines.append("| " + " | ".join(values) + " |")
                 
             if len(data) > 50:
-                markdown += f"\n*... and {len(data) - 50} more rows*"
+                lines.append(f"\n*... and {len(data) - 50} more rows*")
                 
-            table_text.setMarkdown(markdown)
+            table_text.setMarkdown("\n".join(lines))
         else:
             table_text.setText("No data to display")
             
@@ -881,6 +1486,18 @@ class ExcelChatBotGUI(QMainWindow):
     
     def show_sheet_selection_dialog(self, sheets):
         """Show sheet selection dialog"""
+        if self._sheet_dialog is None:
+            self._build_sheet_selection_dialog()
+        
+        self._sheet_combo.clear()
+        self._sheet_combo.addItems(sheets)
+        
+        if self._sheet_dialog.exec() == QDialog.DialogCode.Accepted:
+            return self._sheet_combo.currentText()
+        return None
+    
+    def _build_sheet_selection_dialog(self):
+        """Create the sheet selection dialog once; later calls only refill the list"""
         dialog = QDialog(self)
         dialog.setWindowTitle("Select Sheet")
         dialog.setGeometry(300, 300, 400, 300)
@@ -892,9 +1509,8 @@ class ExcelChatBotGUI(QMainWindow):
         layout.addWidget(info_label)
         
         # Sheet list
-        sheet_combo = QComboBox()
-        sheet_combo.addItems(sheets)
-        layout.addWidget(sheet_combo)
+        self._sheet_combo = QComboBox()
+        layout.addWidget(self._sheet_combo)
         
         # Buttons
         button_box = QDialogButtonBox(
@@ -904,12 +1520,27 @@ class ExcelChatBotGUI(QMainWindow):
         button_box.rejected.connect(dialog.reject)
         layout.addWidget(button_box)
         
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            return sheet_combo.currentText()
-        return None
+        self._sheet_dialog = dialog
     
     def show_column_mapping_dialog(self, columns):
         """Show column mapping dialog"""
+        if self._mapping_dialog is None:
+            self._build_column_mapping_dialog()
+        
+        # Refill the shared model only when the columns changed; every combo starts
+        # again on the blank entry
+        items = [''] + list(columns)
+        if self._mapping_model.stringList() != items:
+            self._mapping_model.setStringList(items)
+        for combo in self._mapping_combos.values():
+            combo.setCurrentIndex(0)
+        
+        if self._mapping_dialog.exec() == QDialog.DialogCode.Accepted:
+            return {field: combo.currentText() for field, combo in self._mapping_combos.items()}
+        return None
+    
+    def _build_column_mapping_dialog(self):
+        """Create the column mapping dialog once; later calls only refill its model"""
         dialog = QDialog(self)
         dialog.setWindowTitle("Map Columns")
         dialog.setGeometry(250, 250, 500, 400)
@@ -923,29 +1554,22 @@ class ExcelChatBotGUI(QMainWindow):
         # Mapping grid
         grid = QGridLayout()
         
-        # Account column
-        grid.addWidget(QLabel("Account Name:"), 0, 0)
-        account_combo = QComboBox()
-        account_combo.addItems([''] + columns)
-        grid.addWidget(account_combo, 0, 1)
-        
-        # Debit column
-        grid.addWidget(QLabel("Debit Amount:"), 1, 0)
-        debit_combo = QComboBox()
-        debit_combo.addItems([''] + columns)
-        grid.addWidget(debit_combo, 1, 1)
-        
-        # Credit column
-        grid.addWidget(QLabel("Credit Amount:"), 2, 0)
-        credit_combo = QComboBox()
-        credit_combo.addItems([''] + columns)
-        grid.addWidget(credit_combo, 2, 1)
-        
-        # Balance column (optional)
-        grid.addWidget(QLabel("Balance (optional):"), 3, 0)
-        balance_combo = QComboBox()
-        balance_combo.addItems([''] + columns)
-        grid.addWidget(balance_combo, 3, 1)
+        # One item model shared by every combo box
+        self._mapping_model = QStringListModel(dialog)
+        self._mapping_combos = {}
+        
+        fields = [
+            ('account', "Account Name:"),
+            ('debit', "Debit Amount:"),
+            ('credit', "Credit Amount:"),
+            ('balance', "Balance (optional):")
+        ]
+        for row, (field, label) in enumerate(fields):
+            grid.addWidget(QLabel(label), row, 0)
+            combo = QComboBox()
+            combo.setModel(self._mapping_model)
+            grid.addWidget(combo, row, 1)
+            self._mapping_combos[field] = combo
         
         layout.addLayout(grid)
         
@@ -957,14 +1581,7 @@ class ExcelChatBotGUI(QMainWindow):
         button_box.rejected.connect(dialog.reject)
         layout.addWidget(button_box)
         
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            return {
-                'account': account_combo.currentText(),
-                'debit': debit_combo.currentText(),
-                'credit': credit_combo.currentText(),
-                'balance': balance_combo.currentText()
-            }
-        return None
+        self._mapping_dialog = dialog
     
     def show_preview_changes_dialog(self, changes):
         """Show preview of changes dialog"""
@@ -983,17 +1600,16 @@ class ExcelChatBotGUI(QMainWindow):
         changes_text = QTextBrowser()
         
         # Format changes as markdown table
-        markdown = "| Account | Current | Proposed | Change |\n"
-        markdown += "| --- | --- | --- | --- |\n"
+        lines = ["| Account | Current | Proposed | Change |", "| --- | --- | --- | --- |"]
         
         for change in changes:
             account = change.get('account', 'Unknown')
             current = change.get('current_value', 'N/A')
             proposed = change.get('proposed_value', 'N/A')
             diff = change.get('difference', 'N/A')
-            markdown += f"| {account} | {current} | {proposed} | {diff} |\n"
+            lines.append(f"| {account} | {current} | {proposed} | {diff} |")
             
-        changes_text.setMarkdown(markdown)
+        changes_text.setMarkdown("\n".join(lines))
         layout.addWidget(changes_text)
         
         # Buttons
@@ -1008,194 +1624,64 @@ class ExcelChatBotGUI(QMainWindow):
     
     def autonomous_mode(self):
         """Run autonomous mode to automatically detect and update trial balance"""
-        try:
-            self.add_message("🤖 Starting autonomous mode...", "assistant")
-            self.update_status("Running autonomous mode...")
-            
-            # Step 1: Detect Excel and sheets
-            excel_status = self.chatbot.get_excel_status()
-            if not excel_status['has_excel'] or not excel_status['has_workbook']:
-                self.add_message("❌ Please ensure Excel is running with a workbook open.", "assistant")
-                return
-            
-            # Step 2: Auto-detect trial balance sheets
-            trial_balance_sheets = self.auto_detect_sheets(excel_status['sheet_names'])
-            
-            if not trial_balance_sheets:
-                self.add_message("❌ No trial balance sheets detected. Please ensure your workbook contains trial balance data.", "assistant")
-                return
-            
-            self.add_message(f"📊 Detected {len(trial_balance_sheets)} potential trial balance sheet(s): {', '.join(trial_balance_sheets)}", "assistant")
-            
-            # Step 3: Process each sheet
-            for sheet_name in trial_balance_sheets:
-                self.add_message(f"🔍 Analyzing sheet: {sheet_name}", "assistant")
-                
-                # Auto-detect columns
-                column_mapping = self.auto_detect_columns(sheet_name)
-                
-                if not column_mapping:
-                    self.add_message(f"⚠️ Could not detect trial balance columns in sheet '{sheet_name}'. Skipping...", "assistant")
-                    continue
-                
-                self.add_message(f"✅ Column mapping detected for '{sheet_name}': {column_mapping}", "assistant")
-                
-                # Preview changes (simplified for autonomous mode)
-                self.add_message(f"📋 Sheet '{sheet_name}' is ready for updates. Column mapping: {column_mapping}", "assistant")
-            
-            self.add_message("🎉 Autonomous analysis complete! Use the update commands to proceed with modifications.", "assistant")
-            self.update_status("Autonomous mode complete")
-            
-        except Exception as e:
-            self.add_message(f"❌ Error in autonomous mode: {str(e)}", "assistant")
-            self.update_status("Ready")
+        self.add_message("🤖 Starting autonomous mode...", "assistant")
+        # Detection reads every candidate sheet, so it runs on the Excel worker
+        self.chatbot.handle_excel_request('autonomous')
+
+def setup_logging():
+    """Route log records through a queue so handler I/O never runs on the GUI thread.
     
-    def auto_detect_sheets(self, sheet_names):
-        """Auto-detect sheets that likely contain trial balance data"""
-        trial_balance_keywords = [
-            'trial', 'balance', 'tb', 'trial balance', 'trialbalance',
-            'accounts', 'ledger', 'general ledger', 'gl', 'chart of accounts'
-        ]
-        
-        detected_sheets = []
-        
-        for sheet_name in sheet_names:
-            sheet_lower = sheet_name.lower()
-            
-            # Check for keywords
-            for keyword in trial_balance_keywords:
-                if keyword in sheet_lower:
-                    detected_sheets.append(sheet_name)
-                    break
-            
-            # Also check sheet structure (if it has typical trial balance columns)
-            try:
-                app = xw.App.active
-                wb = app.books.active
-                ws = wb.sheets[sheet_name]
-                
-                # Get first few rows to check for typical headers
-                if ws.used_range and ws.used_range.shape[0] > 0:
-                    first_row = ws.range(f"A1:{chr(64 + min(10, ws.used_range.shape[1]))}1").value
-                    if isinstance(first_row, list):
-                        headers = [str(cell).lower() if cell else '' for cell in first_row]
-                    else:
-                        headers = [str(first_row).lower() if first_row else '']
-                    
-                    # Check for typical trial balance headers
-                    account_found = any('account' in h or 'name' in h for h in headers)
-                    amount_found = any(word in h for h in headers for word in ['debit', 'credit', 'balance', 'amount'])
-                    
-                    if account_found and amount_found and sheet_name not in detected_sheets:
-                        detected_sheets.append(sheet_name)
-                        
-            except Exception:
-                continue  # Skip sheets that can't be analyzed
-        
-        return detected_sheets
+    Records go to LOG_FILE when it is set, otherwise to stderr. File writes are
+    buffered and flushed in batches or as soon as an error is logged. Returns the
+    started QueueListener; stop it and call logging.shutdown() on exit to flush
+    what is still queued or buffered.
+    """
+    log_file = os.getenv('LOG_FILE')
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s')
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handler = MemoryHandler(capacity=512, flushLevel=logging.ERROR, target=file_handler)
+    else:
+        handler = logging.StreamHandler()
+        handler.setFormatter(formatter)
     
-    def auto_detect_columns(self, sheet_name):
-        """Auto-detect column mapping for a trial balance sheet"""
-        try:
-            app = xw.App.active
-            wb = app.books.active
-            ws = wb.sheets[sheet_name]
-            
-            if not ws.used_range or ws.used_range.shape[0] == 0:
-                return None
-            
-            # Get headers (try first few rows)
-            headers = []
-            for row in range(1, min(4, ws.used_range.shape[0] + 1)):
-                row_data = ws.range(f"A{row}:{chr(64 + min(20, ws.used_range.shape[1]))}{row}").value
-                if isinstance(row_data, list):
-                    potential_headers = [str(cell) if cell else '' for cell in row_data]
-                else:
-                    potential_headers = [str(row_data) if row_data else '']
-                
-                # Check if this looks like a header row
-                if any(word in h.lower() for h in potential_headers for word in ['account', 'debit', 'credit', 'balance']):
-                    headers = potential_headers
-                    break
-            
-            if not headers:
-                return None
-            
-            # Map columns based on keywords
-            column_mapping = {}
-            
-            for i, header in enumerate(headers):
-                header_lower = header.lower()
-                col_letter = chr(65 + i)  # A, B, C, etc.
-                
-                # Account column
-                if any(word in header_lower for word in ['account', 'name', 'description']):
-                    if 'account' not in column_mapping:
-                        column_mapping['account'] = col_letter
-                
-                # Debit column
-                elif 'debit' in header_lower:
-                    column_mapping['debit'] = col_letter
-                
-                # Credit column
-                elif 'credit' in header_lower:
-                    column_mapping['credit'] = col_letter
-                
-                # Balance column
-                elif 'balance' in header_lower:
-                    column_mapping['balance'] = col_letter
-                
-                # Amount column (generic)
-                elif 'amount' in header_lower and 'debit' not in column_mapping and 'credit' not in column_mapping:
-                    column_mapping['amount'] = col_letter
-            
-            # Fallback: if we found account but no debit/credit, look for numeric columns
-            if 'account' in column_mapping and 'debit' not in column_mapping and 'credit' not in column_mapping:
-                # Find numeric columns after the account column
-                account_col_index = ord(column_mapping['account']) - 65
-                
-                for i in range(account_col_index + 1, len(headers)):
-                    if i < len(headers):
-                        col_letter = chr(65 + i)
-                        # Check if this column contains numeric data
-                        try:
-                            sample_value = ws.range(f"{col_letter}2").value
-                            if isinstance(sample_value, (int, float)):
-                                if 'debit' not in column_mapping:
-                                    column_mapping['debit'] = col_letter
-                                elif 'credit' not in column_mapping:
-                                    column_mapping['credit'] = col_letter
-                                    break
-                        except:
-                            continue
-            
-            # Return mapping if we found at least account column
-            if 'account' in column_mapping:
-                return column_mapping
-            
-            return None
-            
-        except Exception as e:
-            return None
+    log_queue = queue.Queue()
+    root = logging.getLogger()
+    # Third-party libraries (urllib3, xlwings) only get through with warnings;
+    # LOG_LEVEL applies to the app's own loggers
+    root.setLevel(logging.WARNING)
+    app_level = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper(), logging.INFO)
+    for name in (__name__, 'excel_processor'):
+        logging.getLogger(name).setLevel(app_level)
+    root.addHandler(QueueHandler(log_queue))
+    
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    return listener
 
 def main():
     """Main application entry point"""
     app = QApplication(sys.argv)
     
     # Set application properties
-    app.setApplicationName("Excel Trial Balance ChatBot")
-    app.setApplicationVersion("1.0")
+    app.setApplicationName(APP_NAME)
+    app.setApplicationVersion(APP_VERSION)
     
     # Load API key from environment
     from dotenv import load_dotenv
     load_dotenv()
+    log_listener = setup_logging()
     
     # Create and show the main window
     window = ExcelChatBotGUI()
     window.show()
     
     # Run the application
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    log_listener.stop()
+    logging.shutdown()
+    sys.exit(exit_code)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,28 +1,162 @@
+import os
+import sys
+import threading
 import xlwings as xw
-# Prefer rapidfuzz if available for faster similarity; fallback to fuzzywuzzy
-try:
-    from rapidfuzz import fuzz as _rf_fuzz  # type: ignore
-    _USE_RAPIDFUZZ = True
-except Exception:  # rapidfuzz not installed
-    from fuzzywuzzy import fuzz as _fw_fuzz
-    _USE_RAPIDFUZZ = False
+from rapidfuzz import fuzz, process
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List, Dict, Tuple, Optional
 
 
-def _similarity(a: str, b: str) -> float:
-    """Compute string similarity ratio (0-100). Uses rapidfuzz if available."""
-    if _USE_RAPIDFUZZ:
-        return _rf_fuzz.ratio(a, b)
-    else:
-        return _fw_fuzz.ratio(a, b)
+# Attached Excel application per thread, since COM handles are apartment-bound
+_excel = threading.local()
+
+def get_excel_app():
+    """Return the active Excel application, attaching only on first use in this thread.
+    
+    A cached handle is probed with one cheap COM read; if Excel went away (e.g. it was
+    restarted) the stale handle is dropped and the app is attached afresh, once.
+    """
+    app = getattr(_excel, 'app', None)
+    if app is not None:
+        try:
+            app.pid
+            return app
+        except Exception:
+            _excel.app = None
+    app = _excel.app = xw.apps.active
+    return app
+
+def reset_excel_app() -> bool:
+    """Drop this thread's cached Excel handle; returns True if one was cached"""
+    had_app = getattr(_excel, 'app', None) is not None
+    _excel.app = None
+    return had_app
+
+def _normalize_account_name(name: str) -> str:
+    """Normalize an account name for matching (drop '|', strip, lowercase)."""
+    return name.replace('|', '').strip().lower()
+
+def get_sheet_names(wb) -> List[str]:
+    """Return a workbook's sheet names in order.
+    
+    On Windows the COM Sheets collection is enumerated directly, skipping the
+    per-index Sheet lookup xlwings makes before reading each name.
+    """
+    if sys.platform == 'win32':
+        return [sheet.Name for sheet in wb.api.Sheets]
+    return wb.sheet_names
+
+# App settings excel_batch() changes for bulk writes, as (attribute, batch value)
+BATCH_SETTINGS = (('screen_updating', False), ('display_alerts', False), ('calculation', 'manual'))
+# Reads only need the repaint paused
+SCREEN_SETTINGS = (('screen_updating', False),)
+
+@contextmanager
+def excel_batch(app, settings=BATCH_SETTINGS):
+    """Pause screen updating, alerts and automatic recalculation around bulk Excel work.
+    
+    Pass SCREEN_SETTINGS to pause repainting only. The previous settings are
+    restored on exit; settings the app doesn't expose are left untouched.
+    """
+    saved = {}
+    for attr, batch_value in settings:
+        value = getattr(app, attr, None)
+        if value is not None:
+            saved[attr] = value
+            setattr(app, attr, batch_value)
+    try:
+        yield app
+    finally:
+        for attr, value in saved.items():
+            setattr(app, attr, value)
+
+def get_saved_path(wb) -> Optional[str]:
+    """Return the workbook's file path when Excel holds no unsaved changes, else None.
+    
+    Only Windows exposes the saved flag cheaply, and only .xlsx/.xlsm files can be
+    read back with openpyxl.
+    """
+    if sys.platform != 'win32':
+        return None
+    try:
+        if not wb.api.Saved:
+            return None
+        path = wb.fullname
+    except Exception:
+        return None
+    if path.lower().endswith(('.xlsx', '.xlsm')) and os.path.isfile(path):
+        return path
+    return None
+
+def read_sheet_summaries_from_file(path: str) -> Optional[List[Dict]]:
+    """Read each sheet's size and header row from a workbook file in read-only mode.
+    
+    Returns:
+        Optional[List[Dict]]: One dict per sheet with name, rows, cols and headers,
+        or None when openpyxl is unavailable or the file can't be read.
+    """
+    try:
+        import openpyxl
+    except ImportError:
+        return None
+    
+    try:
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    except Exception:
+        return None
+    
+    try:
+        summaries = []
+        for ws in wb.worksheets:
+            # Some writers omit or misstate the stored dimension; measure those sheets
+            if not ws.max_row or not ws.max_column:
+                ws.reset_dimensions()
+                ws.calculate_dimension(force=True)
+            
+            header_row = next(ws.iter_rows(min_row=1, max_row=1, max_col=26, values_only=True), ())
+            headers = [h for h in header_row if h is not None]
+            
+            # A blank sheet reports A1 as its dimension, like Excel's used range
+            if ws.max_row == 1 and ws.max_column == 1 and not headers:
+                rows = cols = 0
+            else:
+                rows, cols = ws.max_row, ws.max_column
+            
+            summaries.append({'name': ws.title, 'rows': rows, 'cols': cols, 'headers': headers})
+        return summaries
+    except Exception:
+        return None
+    finally:
+        wb.close()
+
+def get_used_range(sheet):
+    """Return a sheet's used range, or None when nothing has been entered.
+    
+    Excel reports a blank sheet's used range as an empty A1, so that case is
+    recognised without reading any further cells.
+    """
+    used_range = sheet.used_range
+    if used_range.shape == (1, 1) and used_range.value is None:
+        return None
+    return used_range
 
 class TrialBalanceProcessor:
     """Processes Excel trial balance updates using fuzzy matching logic"""
     
+    # Upper bound on memoized fuzzy match results kept across update runs
+    MATCH_CACHE_SIZE = 10000
+    
     def __init__(self, fuzzy_threshold: int = 80):
         self.fuzzy_threshold = fuzzy_threshold
         self.logger = logging.getLogger(__name__)
+        # normalized source name -> (target index, score) for the reference set in _match_refs
+        self._match_cache: OrderedDict = OrderedDict()
+        # (threshold, reference names) the cached match results were scored against
+        self._match_refs: Optional[Tuple[int, Tuple[str, ...]]] = None
+        # ((path, mtime, active sheet), structure) for the last saved workbook analyzed
+        self._structure_cache: Optional[Tuple[tuple, Dict]] = None
         
     def is_cell_bold(self, sheet, cell_address: str) -> bool:
         """Check if a cell is bold.
@@ -42,7 +176,7 @@ class TrialBalanceProcessor:
     def get_excel_status(self) -> Dict[str, any]:
         """Get current Excel application status"""
         try:
-            app = xw.apps.active
+            app = get_excel_app()
             if not app or not app.books:
                 return {
                     'status': 'no_excel',
@@ -50,7 +184,7 @@ class TrialBalanceProcessor:
                 }
             
             wb = app.books.active
-            sheets = [sheet.name for sheet in wb.sheets]
+            sheets = get_sheet_names(wb)
             
             return {
                 'status': 'active',
@@ -59,6 +193,95 @@ class TrialBalanceProcessor:
                 'message': f'Excel is open with workbook "{wb.name}" containing {len(sheets)} sheets'
             }
         except Exception as e:
+            reset_excel_app()
+            return {
+                'status': 'error',
+                'message': f'Error accessing Excel: {str(e)}'
+            }
+    
+    def get_workbook_snapshot(self) -> Dict[str, any]:
+        """Read Excel/workbook availability, sheet names and active sheet in one pass.
+        
+        COM errors are not caught, so callers can drop a stale handle and retry.
+        
+        Returns:
+            Dict[str, Any]: has_excel, has_workbook, workbook_name, sheet_names and
+            active_sheet.
+        """
+        app = get_excel_app()
+        if not app:
+            return {'has_excel': False, 'has_workbook': False, 'workbook_name': None,
+                    'sheet_names': [], 'active_sheet': None}
+        if not app.books:
+            return {'has_excel': True, 'has_workbook': False, 'workbook_name': None,
+                    'sheet_names': [], 'active_sheet': None}
+        
+        wb = app.books.active
+        return {
+            'has_excel': True,
+            'has_workbook': True,
+            'workbook_name': wb.name,
+            'sheet_names': get_sheet_names(wb),
+            'active_sheet': wb.sheets.active.name
+        }
+    
+    def analyze_structure_batched(self) -> Dict[str, any]:
+        """Collect the active workbook's structure with as few Excel round-trips as possible.
+        
+        Returns:
+            Dict[str, Any]: Workbook name, active sheet, sheet names and the active
+            sheet's used-range size and header row.
+        """
+        try:
+            app = get_excel_app()
+            if not app or not app.books:
+                return {
+                    'status': 'no_excel',
+                    'message': 'Excel is not open or no workbook is active'
+                }
+            
+            wb = app.books.active
+            ws = wb.sheets.active
+            
+            # A saved workbook's structure can only change along with its file
+            path = get_saved_path(wb)
+            cache_key = None
+            if path:
+                try:
+                    cache_key = (path, os.path.getmtime(path), ws.name)
+                except OSError:
+                    # File moved or deleted since Excel saved it; scan the live workbook
+                    pass
+            if cache_key is not None and self._structure_cache and self._structure_cache[0] == cache_key:
+                return dict(self._structure_cache[1])
+            
+            with excel_batch(app, SCREEN_SETTINGS):
+                sheet_names = get_sheet_names(wb)
+                
+                # Used-range size comes from a single address lookup; a blank sheet has none
+                used_range = get_used_range(ws)
+                rows, cols = used_range.shape if used_range is not None else (0, 0)
+                
+                # Read the whole header row in one call
+                headers = []
+                if rows > 0:
+                    first_row = ws.range((1, 1), (1, cols)).options(ndim=1).value
+                    headers = [str(cell) if cell is not None else f"Column {i+1}" for i, cell in enumerate(first_row)]
+            
+            structure = {
+                'status': 'success',
+                'workbook_name': wb.name,
+                'active_sheet': ws.name,
+                'sheets': sheet_names,
+                'rows': rows,
+                'columns': cols,
+                'headers': headers
+            }
+            if cache_key is not None:
+                self._structure_cache = (cache_key, structure)
+            return dict(structure)
+        except Exception as e:
+            reset_excel_app()
             return {
                 'status': 'error',
                 'message': f'Error accessing Excel: {str(e)}'
@@ -76,17 +299,21 @@ class TrialBalanceProcessor:
             List[Tuple[int, Any]]: List of (row_number, value) tuples.
         """
         try:
-            app = xw.apps.active
+            app = get_excel_app()
             wb = app.books.active
             sheet = wb.sheets[sheet_name]
             data = []
             
             # Find the last used row in the column
             last_row = sheet.range(f"{column}1").end('down').row
+            if last_row < start_row:
+                return data
+            
+            # Read the column's values in one call; only candidates get a bold check
+            values = sheet.range(f"{column}{start_row}:{column}{last_row}").options(ndim=1).value
             
-            for row in range(start_row, last_row + 1):
+            for row, value in enumerate(values, start_row):
                 cell_address = f"{column}{row}"
-                value = sheet.range(cell_address).value
                 
                 # Skip empty cells and bold cells
                 if value is not None and str(value).strip() and not self.is_cell_bold(sheet, cell_address):
@@ -94,13 +321,14 @@ class TrialBalanceProcessor:
             
             return data
         except Exception as e:
-            self.logger.error(f"Error getting data from column {column}: {str(e)}")
+            reset_excel_app()
+            self.logger.error("Error getting data from column %s: %s", column, e)
             return []
     
     def analyze_sheet_structure(self, sheet_name: str) -> Dict[str, any]:
         """Analyze the structure of a specific sheet"""
         try:
-            app = xw.apps.active
+            app = get_excel_app()
             wb = app.books.active
             sheet = wb.sheets[sheet_name]
             
@@ -136,6 +364,7 @@ class TrialBalanceProcessor:
             }
             
         except Exception as e:
+            reset_excel_app()
             return {
                 'status': 'error',
                 'message': f'Error analyzing sheet "{sheet_name}": {str(e)}'
@@ -148,7 +377,7 @@ class TrialBalanceProcessor:
             amount_cols = [1, 3]  # Default columns B and D (0-indexed)
             
         try:
-            app = xw.apps.active
+            app = get_excel_app()
             wb = app.books.active
             sheet = wb.sheets[sheet_name]
             used = sheet.used_range
@@ -171,37 +400,50 @@ class TrialBalanceProcessor:
                     col_idx = col_idx // 26 - 1
                 return result
             
+            def column_range(col_idx: int):
+                """The row window of a 0-based column"""
+                return sheet.range((row_start, col_idx + 1), (row_end, col_idx + 1))
+            
+            def bold_check(col_idx: int):
+                """Return a row -> is-bold test for a column.
+                
+                Font.Bold over a range is True/False when every cell agrees and None
+                when mixed, so only mixed columns need a lookup per cell.
+                """
+                try:
+                    uniform = column_range(col_idx).api.Font.Bold
+                except Exception:
+                    uniform = None
+                if uniform is not None:
+                    return lambda row_num: bool(uniform)
+                col_letter = col_index_to_letter(col_idx)
+                return lambda row_num: self.is_cell_bold(sheet, f"{col_letter}{row_num}")
+            
+            # Read each needed column for the whole row window in one call
+            names = column_range(account_col).options(ndim=1).value
+            amount_values = [column_range(col_idx).options(ndim=1).value for col_idx in amount_cols]
+            account_is_bold = bold_check(account_col)
+            amount_is_bold = [bold_check(col_idx) for col_idx in amount_cols]
+            
             accounts: List[Dict] = []
             
             # Process each row within the specified range (default from 2 to last_row)
-            for row_num in range(row_start, row_end + 1):
-                account_col_letter = col_index_to_letter(account_col)
-                account_cell_address = f"{account_col_letter}{row_num}"
-                
-                # Get account name and check if cell is bold or empty
-                name = sheet.range(account_cell_address).value
+            for offset, name in enumerate(names):
+                row_num = row_start + offset
                 
-                # Skip if cell is empty, bold, or doesn't meet criteria
+                # Skip if cell is empty, doesn't meet criteria, or is bold
                 if (name is None or 
                     not str(name).strip() or 
-                    self.is_cell_bold(sheet, account_cell_address) or
                     not isinstance(name, str) or 
                     len(name) <= 5 or 
-                    name.startswith('^')):
+                    name.startswith('^') or
+                    account_is_bold(row_num)):
                     continue
                 
-                # Extract amounts from specified columns
+                # Extract amounts from specified columns, skipping bold cells (but allowing empty amounts)
                 amounts = {}
-                for j, amount_col_idx in enumerate(amount_cols):
-                    amount_col_letter = col_index_to_letter(amount_col_idx)
-                    amount_cell_address = f"{amount_col_letter}{row_num}"
-                    
-                    # Get amount value, skip if bold (but allow empty amounts)
-                    amount_val = sheet.range(amount_cell_address).value
-                    if not self.is_cell_bold(sheet, amount_cell_address):
-                        amounts[f'amount_{j+1}'] = amount_val
-                    else:
-                        amounts[f'amount_{j+1}'] = None
+                for j, values in enumerate(amount_values):
+                    amounts[f'amount_{j+1}'] = None if amount_is_bold[j](row_num) else values[offset]
                 
                 accounts.append({
                     'row_index': row_num - 1,  # 0-based for compatibility
@@ -213,7 +455,8 @@ class TrialBalanceProcessor:
             return accounts
             
         except Exception as e:
-            self.logger.error(f"Error extracting accounts from {sheet_name}: {str(e)}")
+            reset_excel_app()
+            self.logger.error("Error extracting accounts from %s: %s", sheet_name, e)
             return []
     
     def perform_fuzzy_matching(self, source_accounts: List[Dict], 
@@ -225,12 +468,13 @@ class TrialBalanceProcessor:
         target_index: Dict[str, Dict] = {}
         cleaned_targets: List[Tuple[str, Dict]] = []  # (clean_name, account)
         for t in target_accounts:
-            clean_t = t['account_name'].replace('|', '').strip().lower()
+            clean_t = _normalize_account_name(t['account_name'])
             target_index[clean_t] = t
             cleaned_targets.append((clean_t, t))
         
+        fuzzy_sources: List[Tuple[str, Dict]] = []  # (clean_name, account) without exact match
         for s in source_accounts:
-            clean_s = s['account_name'].replace('|', '').strip().lower()
+            clean_s = _normalize_account_name(s['account_name'])
             # Exact match shortcut
             if clean_s in target_index:
                 t_acc = target_index[clean_s]
@@ -242,17 +486,53 @@ class TrialBalanceProcessor:
                     'target_name_cleaned': clean_s,
                 })
                 continue
-            
-            # Fuzzy search across targets
-            best_score = -1.0
-            best_target: Optional[Dict] = None
-            for clean_t, t in cleaned_targets:
-                score = _similarity(clean_s, clean_t)
-                if score > best_score:
-                    best_score = score
-                    best_target = t
-            
-            if best_target is not None and best_score >= self.fuzzy_threshold:
+            fuzzy_sources.append((clean_s, s))
+        
+        if not fuzzy_sources or not cleaned_targets:
+            return matches
+        
+        # Fuzzy results only depend on the reference names and the threshold, so reuse
+        # earlier results for the same reference set and only score the cache misses.
+        target_names = [clean_t for clean_t, _ in cleaned_targets]
+        match_refs = (self.fuzzy_threshold, tuple(target_names))
+        if match_refs != self._match_refs:
+            self._match_cache.clear()
+            self._match_refs = match_refs
+        best_matches: Dict[str, Optional[Tuple[int, float]]] = {}
+        misses: List[str] = []
+        for clean_s, _ in fuzzy_sources:
+            cached = self._match_cache.get(clean_s)
+            if cached is not None:
+                self._match_cache.move_to_end(clean_s)
+                best_matches[clean_s] = cached
+            elif clean_s not in best_matches:
+                best_matches[clean_s] = None
+                misses.append(clean_s)
+        
+        if misses:
+            # Score all remaining source/target pairs in one vectorized call. Names are
+            # already normalized above, so skip rapidfuzz's per-comparison preprocessing.
+            # Pairs below the threshold are cut off early and scored 0.
+            scores = process.cdist(
+                misses,
+                target_names,
+                scorer=fuzz.ratio,
+                processor=None,
+                score_cutoff=self.fuzzy_threshold,
+                workers=-1
+            )
+            best_indices = scores.argmax(axis=1)
+            for clean_s, row_scores, best_idx in zip(misses, scores, best_indices):
+                result = (int(best_idx), float(row_scores[best_idx]))
+                best_matches[clean_s] = result
+                self._match_cache[clean_s] = result
+            while len(self._match_cache) > self.MATCH_CACHE_SIZE:
+                self._match_cache.popitem(last=False)
+        
+        for clean_s, s in fuzzy_sources:
+            best_idx, best_score = best_matches[clean_s]
+            best_target = cleaned_targets[best_idx][1]
+            if best_score >= self.fuzzy_threshold:
                 matches.append({
                     'source_account': s,
                     'target_account': best_target,
@@ -293,7 +573,7 @@ class TrialBalanceProcessor:
                 correct_end_row = None
             
             # Extract accounts from both sheets
-            self.logger.info(f"Extracting accounts from {to_update_sheet}...")
+            self.logger.info("Extracting accounts from %s...", to_update_sheet)
             to_update_accounts = self.extract_accounts_from_sheet(
                 to_update_sheet, 
                 to_update_cols_idx['account'],
@@ -302,7 +582,7 @@ class TrialBalanceProcessor:
                 end_row=to_update_end_row
             )
             
-            self.logger.info(f"Extracting accounts from {correct_sheet}...")
+            self.logger.info("Extracting accounts from %s...", correct_sheet)
             correct_accounts = self.extract_accounts_from_sheet(
                 correct_sheet,
                 correct_cols_idx['account'],
@@ -311,31 +591,20 @@ class TrialBalanceProcessor:
                 end_row=correct_end_row
             )
             
-            self.logger.info(f"Found {len(to_update_accounts)} accounts in {to_update_sheet}")
-            self.logger.info(f"Found {len(correct_accounts)} accounts in {correct_sheet}")
+            self.logger.info("Found %d accounts in %s", len(to_update_accounts), to_update_sheet)
+            self.logger.info("Found %d accounts in %s", len(correct_accounts), correct_sheet)
             
             # Perform fuzzy matching (now includes exact-match fast path)
             matches = self.perform_fuzzy_matching(to_update_accounts, correct_accounts)
-            self.logger.info(f"Found {len(matches)} matches above {self.fuzzy_threshold}% threshold")
+            self.logger.info("Found %d matches above %s%% threshold", len(matches), self.fuzzy_threshold)
             
             # Prepare Excel and update amounts with performance settings
-            app = xw.apps.active
+            app = get_excel_app()
             wb = app.books.active
             update_sheet = wb.sheets[to_update_sheet]
             
-            prev_screen = getattr(app, 'screen_updating', None)
-            prev_calc = getattr(app, 'calculation', None)
-            prev_alerts = getattr(app, 'display_alerts', None)
-            
             updates_made = 0
-            try:
-                if prev_screen is not None:
-                    app.screen_updating = False
-                if prev_alerts is not None:
-                    app.display_alerts = False
-                if prev_calc is not None:
-                    app.calculation = 'manual'
-                
+            with excel_batch(app):
                 current_col_num = to_update_cols_idx['current_year'] + 1  # 1-indexed
                 prior_col_num = to_update_cols_idx['prior_year'] + 1
                 
@@ -352,21 +621,14 @@ class TrialBalanceProcessor:
                         update_sheet.cells(source_row, prior_col_num).value = amt2
                     
                     updates_made += 1
-            finally:
-                if prev_screen is not None:
-                    app.screen_updating = prev_screen
-                if prev_alerts is not None:
-                    app.display_alerts = prev_alerts
-                if prev_calc is not None:
-                    app.calculation = prev_calc
             
             # Identify new accounts (in correct sheet but not in to_update sheet)
-            matched_target_names = {match['target_account']['account_name'].lower().strip() 
+            matched_target_names = {_normalize_account_name(match['target_account']['account_name']) 
                                   for match in matches}
             
             new_accounts = []
             for correct_acc in correct_accounts:
-                clean_name = correct_acc['account_name'].lower().strip()
+                clean_name = _normalize_account_name(correct_acc['account_name'])
                 if clean_name not in matched_target_names:
                     new_accounts.append(correct_acc)
             
@@ -387,6 +649,7 @@ class TrialBalanceProcessor:
             }
             
         except Exception as e:
+            reset_excel_app()
             error_msg = f"Error updating trial balance: {str(e)}"
             self.logger.error(error_msg)
             return {
@@ -399,7 +662,7 @@ class TrialBalanceProcessor:
                           column_mapping: Dict[str, str]) -> Dict[str, any]:
         """Verify that the updates were actually applied to the target sheet"""
         try:
-            app = xw.apps.active
+            app = get_excel_app()
             wb = app.books.active
             sheet = wb.sheets[sheet_name]
             
@@ -409,6 +672,17 @@ class TrialBalanceProcessor:
             current_col_idx = self.column_letter_to_index(column_mapping['current_year'])
             prior_col_idx = self.column_letter_to_index(column_mapping['prior_year'])
             
+            # Read both amount columns back over the updated rows in one call each
+            if matches:
+                updated_rows = [match['source_account']['excel_row'] for match in matches]
+                first_row, last_row = min(updated_rows), max(updated_rows)
+                current_values = sheet.range(
+                    (first_row, current_col_idx + 1), (last_row, current_col_idx + 1)
+                ).options(ndim=1).value
+                prior_values = sheet.range(
+                    (first_row, prior_col_idx + 1), (last_row, prior_col_idx + 1)
+                ).options(ndim=1).value
+            
             for match in matches:
                 source_row = match['source_account']['excel_row']
                 target_amounts = match['target_account']
@@ -416,7 +690,7 @@ class TrialBalanceProcessor:
                 # Check current year amount
                 expected_amt1 = target_amounts.get('amount_1')
                 if expected_amt1 is not None:
-                    actual_value = sheet.cells(source_row, current_col_idx + 1).value
+                    actual_value = current_values[source_row - first_row]
                     if actual_value == expected_amt1:
                         verified_updates += 1
                     else:
@@ -431,7 +705,7 @@ class TrialBalanceProcessor:
                 # Check prior year amount
                 expected_amt2 = target_amounts.get('amount_2')
                 if expected_amt2 is not None:
-                    actual_value = sheet.cells(source_row, prior_col_idx + 1).value
+                    actual_value = prior_values[source_row - first_row]
                     if actual_value == expected_amt2:
                         verified_updates += 1
                     else:
@@ -447,10 +721,10 @@ class TrialBalanceProcessor:
             
             if success:
                 message = f"Update verification PASSED: All {verified_updates} updates confirmed"
-                self.logger.info(f"✅ {message}")
+                self.logger.info("✅ %s", message)
             else:
                 message = f"Update verification FAILED: {len(failed_updates)} updates not applied correctly"
-                self.logger.warning(f"❌ {message}")
+                self.logger.warning("❌ %s", message)
             
             return {
                 'verified': success,
@@ -460,8 +734,9 @@ class TrialBalanceProcessor:
             }
             
         except Exception as e:
+            reset_excel_app()
             error_msg = f"Update verification failed due to error: {str(e)}"
-            self.logger.error(f"❌ {error_msg}")
+            self.logger.error("❌ %s", error_msg)
             return {
                 'verified': False,
                 'error': error_msg,
@@ -479,70 +754,76 @@ class TrialBalanceProcessor:
                         column_mapping: Dict[str, str], row_range: Dict[str, int] = None) -> Dict[str, any]:
         """Add new accounts to the specified sheet with highlighting"""
         try:
-            app = xw.apps.active
+            app = get_excel_app()
             wb = app.books.active
             sheet = wb.sheets[sheet_name]
             
             # Debug: Log the operation
-            self.logger.info(f"Adding {len(new_accounts)} new accounts to sheet '{sheet_name}'")
-            self.logger.info(f"Column mapping: {column_mapping}")
+            self.logger.info("Adding %d new accounts to sheet '%s'", len(new_accounts), sheet_name)
+            self.logger.info("Column mapping: %s", column_mapping)
             
             # Find the last row with data
             last_row = sheet.used_range.last_cell.row
-            self.logger.info(f"Starting from row {last_row + 1}")
+            self.logger.info("Starting from row %d", last_row + 1)
             
             accounts_added = 0
             highlighted_rows = []
             
-            for account in new_accounts:
-                last_row += 1
-                highlighted_rows.append(last_row)
-                
-                # Add account name
-                account_col = column_mapping['account']
-                account_cell = sheet.range(f"{account_col}{last_row}")
-                account_cell.value = account['account_name']
-                
-                # Add amounts
-                if account.get('amount_1') is not None:
-                    current_col = column_mapping['current_year']
-                    current_cell = sheet.range(f"{current_col}{last_row}")
-                    current_cell.value = account['amount_1']
-                
-                if account.get('amount_2') is not None:
-                    prior_col = column_mapping['prior_year']
-                    prior_cell = sheet.range(f"{prior_col}{last_row}")
-                    prior_cell.value = account['amount_2']
-                
-                accounts_added += 1
-            
-            # Highlight all newly added rows with light yellow background
-            if highlighted_rows:
-                try:
-                    # Get all columns that have data to highlight the entire row
-                    all_cols = [column_mapping['account'], column_mapping['current_year'], column_mapping['prior_year']]
+            with excel_batch(app):
+                for account in new_accounts:
+                    last_row += 1
+                    highlighted_rows.append(last_row)
                     
-                    for row in highlighted_rows:
-                        for col in all_cols:
-                            cell = sheet.range(f"{col}{row}")
-                            # Set bright yellow background using Excel color index
-                            cell.color = 65535  # Bright yellow color
-                            # Make text bold to emphasize new accounts
-                            cell.api.Font.Bold = True
-                            
-                    # Force Excel to refresh/recalculate
-                    wb.save()
+                    # Add account name
+                    account_col = column_mapping['account']
+                    account_cell = sheet.range(f"{account_col}{last_row}")
+                    account_cell.value = account['account_name']
+                    
+                    # Add amounts
+                    if account.get('amount_1') is not None:
+                        current_col = column_mapping['current_year']
+                        current_cell = sheet.range(f"{current_col}{last_row}")
+                        current_cell.value = account['amount_1']
                     
-                except Exception as highlight_error:
-                    error_msg = f"Could not highlight new accounts: {str(highlight_error)}"
-                    self.logger.warning(error_msg)
-                    # Return the error in the result so GUI can show it
-                    return {
-                        'status': 'partial_success',
-                        'accounts_added': accounts_added,
-                        'message': f"Added {accounts_added} new accounts to {sheet_name} but highlighting failed: {str(highlight_error)}",
-                        'highlighted_rows': highlighted_rows
-                    }
+                    if account.get('amount_2') is not None:
+                        prior_col = column_mapping['prior_year']
+                        prior_cell = sheet.range(f"{prior_col}{last_row}")
+                        prior_cell.value = account['amount_2']
+                    
+                    accounts_added += 1
+            
+                # Highlight all newly added rows with light yellow background
+                highlight_error = None
+                if highlighted_rows:
+                    try:
+                        # Get all columns that have data to highlight the entire row
+                        all_cols = [column_mapping['account'], column_mapping['current_year'], column_mapping['prior_year']]
+                        
+                        for row in highlighted_rows:
+                            for col in all_cols:
+                                cell = sheet.range(f"{col}{row}")
+                                # Set bright yellow background using Excel color index
+                                cell.color = 65535  # Bright yellow color
+                                # Make text bold to emphasize new accounts
+                                cell.api.Font.Bold = True
+                    except Exception as e:
+                        highlight_error = e
+            
+            if highlight_error is not None:
+                error_msg = f"Could not highlight new accounts: {str(highlight_error)}"
+                self.logger.warning(error_msg)
+                # Return the error in the result so GUI can show it
+                return {
+                    'status': 'partial_success',
+                    'accounts_added': accounts_added,
+                    'message': f"Added {accounts_added} new accounts to {sheet_name} but highlighting failed: {str(highlight_error)}",
+                    'highlighted_rows': highlighted_rows
+                }
+            
+            if highlighted_rows:
+                # Save once batch mode has restored automatic calculation, so the saved
+                # file holds recalculated values
+                wb.save()
             
             # Verify accounts were actually added
             verification_result = self.verify_accounts_added(sheet_name, new_accounts, column_mapping, row_range)
@@ -556,6 +837,7 @@ class TrialBalanceProcessor:
             }
             
         except Exception as e:
+            reset_excel_app()
             error_msg = f"Error adding new accounts: {str(e)}"
             self.logger.error(error_msg)
             return {
@@ -588,14 +870,14 @@ class TrialBalanceProcessor:
             )
             
             # Check if each expected account is now present
-            current_names = {acc['account_name'].replace('|', '').strip().lower() 
+            current_names = {_normalize_account_name(acc['account_name']) 
                            for acc in current_accounts}
             
             verified_count = 0
             missing_accounts = []
             
             for expected_acc in expected_accounts:
-                expected_name = expected_acc['account_name'].replace('|', '').strip().lower()
+                expected_name = _normalize_account_name(expected_acc['account_name'])
                 if expected_name in current_names:
                     verified_count += 1
                 else:
@@ -605,10 +887,10 @@ class TrialBalanceProcessor:
             
             if success:
                 message = f"Verification PASSED: All {len(expected_accounts)} accounts successfully added"
-                self.logger.info(f"✅ {message}")
+                self.logger.info("✅ %s", message)
             else:
                 message = f"Verification FAILED: {verified_count}/{len(expected_accounts)} accounts found. Missing: {missing_accounts}"
-                self.logger.warning(f"❌ {message}")
+                self.logger.warning("❌ %s", message)
             
             return {
                 'verified': success,
@@ -620,7 +902,7 @@ class TrialBalanceProcessor:
             
         except Exception as e:
             error_msg = f"Verification failed due to error: {str(e)}"
-            self.logger.error(f"❌ {error_msg}")
+            self.logger.error("❌ %s", error_msg)
             return {
                 'verified': False,
                 'error': error_msg,
@@ -630,7 +912,7 @@ class TrialBalanceProcessor:
     def get_column_preview(self, sheet_name=None, column_name=None, max_rows=10):
         """Get preview of data in columns or all sheets if no specific column specified"""
         try:
-            wb = xw.books.active
+            wb = get_excel_app().books.active
             if not wb:
                 return "No active workbook found"
             
@@ -639,21 +921,15 @@ class TrialBalanceProcessor:
                 ws = wb.sheets[sheet_name]
                 
                 # Find the column by header
-                header_row = ws.range('A1:Z1').value
+                header_row = ws.range('A1:Z1').options(ndim=1).value
                 if column_name not in header_row:
                     return f"Column '{column_name}' not found"
                 
                 col_index = header_row.index(column_name) + 1
-                col_letter = chr(64 + col_index)  # Convert to letter (A, B, C, etc.)
                 
                 # Get data from the column
-                data_range = ws.range(f'{col_letter}2:{col_letter}{max_rows + 1}')
-                values = data_range.value
-                
-                if isinstance(values, list):
-                    preview = [str(v) for v in values if v is not None]
-                else:
-                    preview = [str(values)] if values is not None else []
+                values = ws.range((2, col_index), (max_rows + 1, col_index)).options(ndim=1).value
+                preview = [str(v) for v in values if v is not None]
                 
                 return f"Preview of '{column_name}' column:\n" + "\n".join(preview[:max_rows])
             else:
@@ -662,19 +938,18 @@ class TrialBalanceProcessor:
                 
                 for sheet in wb.sheets:
                     try:
-                        # Get data from the sheet (first 10 rows, up to column Z)
-                        data_range = sheet.range('A1:Z10').value
-                        
                         preview_text += f"📋 Sheet: {sheet.name}\n"
                         preview_text += "=" * 50 + "\n"
                         
+                        # Blank sheets are reported without reading their cells
+                        if get_used_range(sheet) is None:
+                            preview_text += "No data found in this sheet\n\n"
+                            continue
+                        
+                        # Get data from the sheet (first 10 rows, up to column Z)
+                        data_range = sheet.range('A1:Z10').options(ndim=2).value
+                        
                         if data_range:
-                            # Handle single row case
-                            if not isinstance(data_range, list):
-                                data_range = [[data_range]]
-                            elif len(data_range) > 0 and not isinstance(data_range[0], list):
-                                data_range = [data_range]
-                            
                             # Create table format
                             for row_idx, row in enumerate(data_range[:10]):
                                 if row and any(cell is not None for cell in row):
@@ -694,6 +969,7 @@ class TrialBalanceProcessor:
                 return preview_text
             
         except Exception as e:
+            reset_excel_app()
             return f"Error getting column preview: {str(e)}"
     
     def get_column_headers(self, sheet_name=None):
@@ -726,31 +1002,32 @@ class TrialBalanceProcessor:
     def analyze_workbook_structure(self):
         """Analyze the entire workbook structure"""
         try:
-            wb = xw.books.active
+            wb = get_excel_app().books.active
             if not wb:
                 return "No active workbook found"
             
+            # A saved workbook is scanned from its file rather than sheet by sheet over COM
+            path = get_saved_path(wb)
+            summaries = read_sheet_summaries_from_file(path) if path else None
+            if summaries is None:
+                summaries = self._read_sheet_summaries(wb)
+            
             analysis = f"📊 Workbook Analysis: {wb.name}\n\n"
             
-            for sheet in wb.sheets:
+            for summary in summaries:
                 try:
-                    # Get basic sheet info
-                    used_range = sheet.used_range
-                    if used_range:
-                        rows = used_range.last_cell.row
-                        cols = used_range.last_cell.column
-                    else:
-                        rows = cols = 0
+                    if 'error' in summary:
+                        raise Exception(summary['error'])
+                    
+                    rows, cols, headers = summary['rows'], summary['cols'], summary['headers']
                     
-                    analysis += f"📋 Sheet: {sheet.name}\n"
+                    analysis += f"📋 Sheet: {summary['name']}\n"
                     analysis += f"   Size: {rows} rows × {cols} columns\n"
                     
-                    # Get column headers
-                    headers = sheet.range('A1:Z1').value
-                    if isinstance(headers, list):
-                        headers = [h for h in headers if h is not None]
-                    else:
-                        headers = [headers] if headers is not None else []
+                    # Blank sheets have no headers to inspect
+                    if not rows:
+                        analysis += "\n"
+                        continue
                     
                     analysis += f"   Headers: {', '.join(headers[:10])}{'...' if len(headers) > 10 else ''}\n"
                     
@@ -769,7 +1046,7 @@ class TrialBalanceProcessor:
                     analysis += "\n"
                     
                 except Exception as e:
-                    analysis += f"📋 Sheet: {sheet.name} (Error: {str(e)})\n\n"
+                    analysis += f"📋 Sheet: {summary['name']} (Error: {str(e)})\n\n"
             
             # Add recommendations
             analysis += "💡 Recommendations:\n"
@@ -780,4 +1057,26 @@ class TrialBalanceProcessor:
             return analysis
             
         except Exception as e:
+            reset_excel_app()
             return f"Error analyzing workbook: {str(e)}"
+    
+    def _read_sheet_summaries(self, wb) -> List[Dict]:
+        """Read each sheet's size and header row from the live workbook"""
+        summaries = []
+        for sheet in wb.sheets:
+            try:
+                used_range = get_used_range(sheet)
+                if used_range is None:
+                    summaries.append({'name': sheet.name, 'rows': 0, 'cols': 0, 'headers': []})
+                    continue
+                
+                headers = [h for h in sheet.range('A1:Z1').options(ndim=1).value if h is not None]
+                summaries.append({
+                    'name': sheet.name,
+                    'rows': used_range.last_cell.row,
+                    'cols': used_range.last_cell.column,
+                    'headers': headers
+                })
+            except Exception as e:
+                summaries.append({'name': sheet.name, 'error': str(e)})
+        return summaries
@@ -153,7 +153,7 @@ def run_test():
         # Test imports
         import xlwings
         import pandas
-        import fuzzywuzzy
+        import rapidfuzz
         from dotenv import load_dotenv
         
         print(f"{Fore.GREEN}✅ All required packages can be imported{Style.RESET_ALL}")